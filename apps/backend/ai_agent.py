@@ -1,92 +1,440 @@
 # apps/backend/ai_agent.py
 
+import asyncio
+import logging
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterator, Optional, Tuple
 from langchain.prompts import PromptTemplate
-from weather import get_weather
+from llm_output import parse_activities
+from metrics import record_llm_parse, record_llm_usage, record_upstream, track_stage
+from resilience import UpstreamUnavailable, get_upstream
+from weather import aget_weather, get_weather
 from rag_service import get_rag_recommendations
+from snapshot_store import get_curated_destination
+from recommendation_cache import recommendation_cache
 import json
 
+logger = logging.getLogger(__name__)
+
 # Get API key from environment variable (no default for security)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
 if not GEMINI_API_KEY:
-    raise ValueError(
+    logger.warning(
         "GEMINI_API_KEY environment variable is not set. "
         "Please create a .env file in apps/backend/ with your API key."
     )
 
-# Define a travel prompt with weather context
+# Define a travel prompt with weather context. The activity count and fields
+# depend on the request (see PromptOptions).
 template = """What should I do and see in {destination}? Current weather information: {weather_info}
 
 CRITICAL: You must respond with ONLY a valid JSON array. No markdown, no code blocks, no explanations.
 
-Return exactly 15 activities in this format:
+Return exactly {count} activities in this format:
 [
-  {{ "activity": "activity name", "description": "activity description", "link": "website URL" }}
+  {activity_format}
 ]
 
 Requirements:
 - ONLY return the JSON array, nothing else
 - NO markdown code blocks (no ```json or ```)
 - Use double quotes for all strings
-- Description max 150 characters
-- Include a real website URL for each activity
-- Consider the current weather: {weather_info}
+{field_requirements}- Consider the current weather: {weather_info}
 
 Start your response with [ and end with ]"""
 
-prompt = PromptTemplate(input_variables=["destination", "weather_info"], template=template)
+prompt = PromptTemplate(
+    input_variables=["destination", "weather_info", "count", "activity_format", "field_requirements"],
+    template=template
+)
+
+# Ask Gemini for JSON matching the activity schema instead of relying on the prompt alone
+GEMINI_STRUCTURED_OUTPUT = os.getenv("GEMINI_STRUCTURED_OUTPUT", "true").lower() in ("1", "true", "yes")
+# Upper bound of generated tokens per call; each call is capped lower based on the activity count
+GEMINI_MAX_OUTPUT_TOKENS = int(os.getenv("GEMINI_MAX_OUTPUT_TOKENS", "2048"))
+
+DEFAULT_ACTIVITY_COUNT = 15
+MAX_ACTIVITY_COUNT = 30
+# Optional activity fields generated by Gemini ("activity" is always generated)
+ACTIVITY_FIELDS = ("description", "link")
+
+_FIELD_FORMATS = {"activity": "activity name", "description": "activity description", "link": "website URL"}
+_FIELD_REQUIREMENTS = {
+    "description": "- Description max 150 characters\n",
+    "link": "- Include a real website URL for each activity\n"
+}
+# Rough output tokens per activity for each field, including the JSON syntax
+_FIELD_TOKENS = {"activity": 15, "description": 45, "link": 25}
+
+
+@dataclass(frozen=True)
+class PromptOptions:
+    """How many activities to generate, and which of ACTIVITY_FIELDS"""
+    count: int = DEFAULT_ACTIVITY_COUNT
+    fields: Tuple[str, ...] = ACTIVITY_FIELDS
+
+    @property
+    def generated_fields(self) -> Tuple[str, ...]:
+        return ("activity",) + self.fields
+
+    @property
+    def variant(self) -> str:
+        """Recommendation cache variant - empty for the default options"""
+        if self == DEFAULT_PROMPT_OPTIONS:
+            return ""
+        return f"{self.count}:{','.join(self.fields)}"
+
+    @property
+    def max_output_tokens(self) -> int:
+        # Twice the estimate: a response cut off by the cap still yields the activities before it
+        estimate = self.count * sum(_FIELD_TOKENS[field] for field in self.generated_fields)
+        return min(GEMINI_MAX_OUTPUT_TOKENS, 2 * estimate + 20)
+
+    def prompt_input(self, destination: str, weather_info: str) -> dict:
+        activity_format = ", ".join(f'"{field}": "{_FIELD_FORMATS[field]}"' for field in self.generated_fields)
+        return {
+            "destination": destination,
+            "weather_info": weather_info,
+            "count": self.count,
+            "activity_format": "{ " + activity_format + " }",
+            "field_requirements": "".join(_FIELD_REQUIREMENTS[field] for field in self.fields)
+        }
+
 
-# Instantiate the LLM using Gemini
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    google_api_key=GEMINI_API_KEY,
-    temperature=0.7
+DEFAULT_PROMPT_OPTIONS = PromptOptions()
+
+
+def _activity_list_schema(fields: Tuple[str, ...]) -> dict:
+    """Gemini response schema: an array of activities with exactly these fields"""
+    return {
+        "type_": "ARRAY",
+        "items": {
+            "type_": "OBJECT",
+            "properties": {field: {"type_": "STRING"} for field in fields},
+            "required": list(fields)
+        }
+    }
+
+def _is_retryable(error: Exception) -> bool:
+    """Quota (429) and transient server errors from the Gemini API"""
+    from google.api_core import exceptions as google_exceptions
+    return isinstance(error, (
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.InternalServerError,
+        google_exceptions.DeadlineExceeded
+    ))
+
+# Rate limit (per worker) and circuit breaker for Gemini. The LangChain client
+# already retries quota errors once, so no extra retries by default.
+_gemini_upstream = get_upstream(
+    "gemini", "GEMINI", _is_retryable, default_rate=5, default_burst=10, default_max_retries=0
 )
 
-# Modern LangChain approach using LCEL (LangChain Expression Language)
-chain = prompt | llm
+# The Gemini client is created on first use (or by warm_up) rather than at import time
+_llm = None
+# prompt | LLM chains by PromptOptions
+_chains = {}
+_chain_lock = threading.Lock()
 
-def get_ai_recommendation(destination: str) -> str:
-    """Return travel recommendations - from RAG if available, otherwise from Gemini"""
-    
-    # First, try to get recommendations from RAG database
+def _get_llm():
+    global _llm
+    if _llm is None:
+        if not GEMINI_API_KEY:
+            raise ValueError(
+                "GEMINI_API_KEY environment variable is not set. "
+                "Please create a .env file in apps/backend/ with your API key."
+            )
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        # Instantiate the LLM using Gemini
+        _llm = ChatGoogleGenerativeAI(
+            model="gemini-2.0-flash",
+            google_api_key=GEMINI_API_KEY,
+            temperature=0.7
+        )
+    return _llm
+
+def get_chain(options: PromptOptions = DEFAULT_PROMPT_OPTIONS):
+    """Return the prompt | LLM chain for the options, creating the Gemini client on first use"""
+    chain = _chains.get(options)
+    if chain is None:
+        with _chain_lock:
+            chain = _chains.get(options)
+            if chain is None:
+                generation_config = {"max_output_tokens": options.max_output_tokens}
+                if GEMINI_STRUCTURED_OUTPUT:
+                    generation_config["response_mime_type"] = "application/json"
+                    generation_config["response_schema"] = _activity_list_schema(options.generated_fields)
+
+                # Modern LangChain approach using LCEL (LangChain Expression Language)
+                chain = prompt | _get_llm().bind(generation_config=generation_config)
+                _chains[options] = chain
+    return chain
+
+def is_llm_initialized() -> bool:
+    return _llm is not None
+
+def _format_weather_info(destination: str, weather: dict) -> str:
+    """Format weather data for the prompt"""
+    if "error" not in weather:
+        return (
+            f"The current weather in {destination} is {weather['temperature']}°C, "
+            f"{weather['description']}, humidity {weather['humidity']}%, "
+            f"wind speed {weather['wind_speed']} m/s."
+        )
+    return f"Weather information is currently unavailable. Error: {weather.get('error', 'Unknown')}"
+
+def _recover_activities(destination: str, weather: dict, content: str, variant: str = "") -> str:
+    """
+    Parse a Gemini response, keeping every valid activity even if the JSON is
+    malformed or truncated, and cache complete responses
+
+    Returns the recovered activities as a clean JSON array, or the raw
+    content if nothing could be recovered.
+    """
+    parsed = parse_activities(content)
+    record_llm_parse(parsed)
+    if parsed.dropped or parsed.repaired:
+        logger.warning(
+            "Gemini response for %s needed repair: %d activities kept, %d repaired, %d dropped",
+            destination, len(parsed.activities), parsed.repaired, parsed.dropped
+        )
+    if not parsed.activities:
+        return content
+
+    recommendation = json.dumps(parsed.activities)
+    # A response cut off mid-array is still served, but not reused
+    if parsed.complete:
+        recommendation_cache.put(destination, weather, recommendation, variant)
+    return recommendation
+
+# Token counts of usage_metadata that add up across stream chunks
+_USAGE_COUNTS = ("input_tokens", "output_tokens", "total_tokens")
+
+def _record_usage(destination: str, usage: Optional[dict]):
+    """Record the input and output tokens of one Gemini call"""
+    if not usage:
+        return
+    record_llm_usage(usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+    logger.info(
+        "Gemini used %d input and %d output tokens for %s",
+        usage.get("input_tokens", 0), usage.get("output_tokens", 0), destination
+    )
+
+def _known_recommendation(destination: str) -> Optional[str]:
+    """Activities of a curated (snapshot) or RAG destination as a JSON string, or None"""
+    # Curated destinations come from the materialized snapshot, already enriched
+    curated = get_curated_destination(destination)
+    if curated is not None:
+        logger.info("Using curated snapshot for %s", destination)
+        return json.dumps(curated['activities'])
+
+    # Then try to get recommendations from RAG database
     rag_activities = get_rag_recommendations(destination)
-    
     if rag_activities:
-        print(f"INFO - Using RAG data for {destination} ({len(rag_activities)} activities)")
-        # Return RAG data as JSON string
+        logger.info("Using RAG data for %s (%d activities)", destination, len(rag_activities))
         return json.dumps(rag_activities)
+    return None
+
+def is_known_destination(destination: str) -> bool:
+    """True if the destination is served from the curated snapshot or RAG rather than Gemini"""
+    return _known_recommendation(destination) is not None
+
+# Stale cached recommendations are regenerated one at a time in the background
+_revalidate_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gemini-revalidate")
+_revalidating = set()
+_revalidating_lock = threading.Lock()
+
+def _cached_recommendation(destination: str, weather: dict, options: PromptOptions) -> Optional[str]:
+    """
+    Cached Gemini response for the destination and weather, or None
+
+    A stale response (past its TTL but within RECOMMENDATION_STALE_TTL) is
+    returned as well, and regenerated in the background.
+    """
+    entry = recommendation_cache.get_entry(destination, weather, options.variant)
+    if entry is None:
+        return None
+    response, remaining_ttl = entry
+    if remaining_ttl <= 0:
+        _revalidate_recommendation(destination, weather, options)
+    return response
+
+def _revalidate_recommendation(destination: str, weather: dict, options: PromptOptions):
+    key = (destination.strip().lower(), options)
+    with _revalidating_lock:
+        if key in _revalidating:
+            return
+        _revalidating.add(key)
+
+    def run():
+        try:
+            logger.info("Regenerating stale Gemini recommendation for %s", destination)
+            _call_gemini(destination, weather, options)
+        finally:
+            with _revalidating_lock:
+                _revalidating.discard(key)
+
+    _revalidate_executor.submit(run)
+
+def _call_gemini(destination: str, weather: dict, options: PromptOptions) -> str:
+    """Ask Gemini for recommendations and cache the parsed response"""
+    logger.info("Getting Gemini recommendation for %s with weather data", destination)
+
+    try:
+        # Use LangChain to get recommendation
+        prompt_input = options.prompt_input(destination, _format_weather_info(destination, weather))
+
+        with track_stage("gemini_invoke"):
+            result = _gemini_upstream.call(get_chain(options).invoke, prompt_input)
+        record_upstream("gemini", "ok")
+        _record_usage(destination, getattr(result, "usage_metadata", None))
+        return _recover_activities(destination, weather, result.content, options.variant)
+    except UpstreamUnavailable as e:
+        logger.warning("Not calling Gemini for %s: %s", destination, e)
+        return f"Error getting recommendation: {e}"
+    except Exception as e:
+        record_upstream("gemini", "error")
+        logger.error("Gemini request for %s failed: %s", destination, e)
+        return f"Error getting recommendation: {e}"
+
+def refresh_recommendation(destination: str, weather: Optional[dict] = None,
+                           options: PromptOptions = DEFAULT_PROMPT_OPTIONS) -> str:
+    """Regenerate the Gemini recommendation for the destination, bypassing the cache"""
+    if weather is None:
+        weather = get_weather(destination)
+    return _call_gemini(destination, weather, options)
+
+def get_ai_recommendation(destination: str, weather: Optional[dict] = None, use_rag: bool = True,
+                          options: PromptOptions = DEFAULT_PROMPT_OPTIONS) -> str:
+    """
+    Return travel recommendations - from the curated snapshot or RAG if
+    available, otherwise from Gemini
+    
+    Args:
+        destination: Destination name
+        weather: Weather data if the caller already has it; fetched otherwise
+                 (get_weather is cached and coalesced, so concurrent callers
+                 share a single OpenWeather request)
+        use_rag: Set to False when the caller already checked the snapshot and RAG database
+        options: Activity count and fields to ask Gemini for (snapshot and
+                 RAG results are returned in full)
+    """
+    
+    known = _known_recommendation(destination) if use_rag else None
+    if known is not None:
+        return known
     
     # If not in RAG, use Gemini
-    print(f"INFO - No RAG data found, using Gemini for {destination}")
+    logger.info("No RAG data found, using Gemini for %s", destination)
     
     # Get weather data
-    weather = get_weather(destination)
+    if weather is None:
+        weather = get_weather(destination)
 
-    # Format weather information
-    if "error" not in weather:
-        weather_info = (
-            f"The current weather in {destination} is {weather['temperature']}°C, "
-            f"{weather['description']}, humidity {weather['humidity']}%, "
-            f"wind speed {weather['wind_speed']} m/s."
-        )
-    else:
-        weather_info = f"Weather information is currently unavailable. Error: {weather.get('error', 'Unknown')}"
+    # Reuse a recent Gemini answer for the same (or a very similar) destination and weather
+    cached = _cached_recommendation(destination, weather, options)
+    if cached is not None:
+        logger.info("Using cached Gemini recommendation for %s", destination)
+        return cached
+
+    return _call_gemini(destination, weather, options)
 
-    print(f"INFO - Getting Gemini recommendation for {destination} with weather data")
+
+async def aget_ai_recommendation(destination: str, weather: Optional[dict] = None, use_rag: bool = True,
+                                 options: PromptOptions = DEFAULT_PROMPT_OPTIONS) -> str:
+    """
+    Async variant of get_ai_recommendation - Gemini is called with
+    chain.ainvoke, and the RAG and recommendation cache lookups (which may
+    compute embeddings) run in worker threads
+    """
+    if use_rag:
+        known = await asyncio.to_thread(_known_recommendation, destination)
+        if known is not None:
+            return known
+
+    logger.info("No RAG data found, using Gemini for %s", destination)
+
+    if weather is None:
+        weather = await aget_weather(destination)
+
+    cached = await asyncio.to_thread(_cached_recommendation, destination, weather, options)
+    if cached is not None:
+        logger.info("Using cached Gemini recommendation for %s", destination)
+        return cached
+
+    logger.info("Getting Gemini recommendation for %s with weather data", destination)
 
     try:
-        # Use LangChain to get recommendation
-        prompt_input = {
-            "destination": destination,
-            "weather_info": weather_info
-        }
+        prompt_input = options.prompt_input(destination, _format_weather_info(destination, weather))
 
-        result = chain.invoke(prompt_input)
-        return result.content
+        with track_stage("gemini_invoke"):
+            result = await _gemini_upstream.acall(get_chain(options).ainvoke, prompt_input)
+        record_upstream("gemini", "ok")
+        _record_usage(destination, getattr(result, "usage_metadata", None))
+        return await asyncio.to_thread(
+            _recover_activities, destination, weather, result.content, options.variant
+        )
+    except UpstreamUnavailable as e:
+        logger.warning("Not calling Gemini for %s: %s", destination, e)
+        return f"Error getting recommendation: {e}"
     except Exception as e:
-        print(f"ERROR - Exception occurred: {e}")
+        record_upstream("gemini", "error")
+        logger.error("Gemini request for %s failed: %s", destination, e)
         return f"Error getting recommendation: {e}"
 
+
+def stream_ai_recommendation(destination: str, weather: Optional[dict] = None,
+                             options: PromptOptions = DEFAULT_PROMPT_OPTIONS) -> Iterator[str]:
+    """
+    Streaming variant of get_ai_recommendation - yields the response text in chunks
+    
+    RAG and cached responses are yielded in one chunk; Gemini responses are
+    yielded token by token as the model generates them.
+    """
+    rag_activities = get_rag_recommendations(destination)
+    
+    if rag_activities:
+        logger.info("Using RAG data for %s (%d activities)", destination, len(rag_activities))
+        yield json.dumps(rag_activities)
+        return
+    
+    logger.info("No RAG data found, streaming from Gemini for %s", destination)
+    
+    if weather is None:
+        weather = get_weather(destination)
+
+    cached = _cached_recommendation(destination, weather, options)
+    if cached is not None:
+        logger.info("Using cached Gemini recommendation for %s", destination)
+        yield cached
+        return
+
+    prompt_input = options.prompt_input(destination, _format_weather_info(destination, weather))
+
+    chunks = []
+    usage = {}
+    try:
+        with track_stage("gemini_stream"):
+            for chunk in _gemini_upstream.stream(get_chain(options).stream, prompt_input):
+                # Each chunk reports the tokens it added (the *_details entries are dicts, not counts)
+                chunk_usage = getattr(chunk, "usage_metadata", None) or {}
+                for key in _USAGE_COUNTS:
+                    usage[key] = usage.get(key, 0) + chunk_usage.get(key, 0)
+                if chunk.content:
+                    chunks.append(chunk.content)
+                    yield chunk.content
+    except UpstreamUnavailable:
+        raise
+    except Exception:
+        record_upstream("gemini", "error")
+        raise
+    record_upstream("gemini", "ok")
+    _record_usage(destination, usage)
+
+    _recover_activities(destination, weather, "".join(chunks), options.variant)
@@ -0,0 +1,120 @@
+# apps/backend/benchmarks/catalog_benchmark.py
+"""
+Compare the load time, memory and per-hit cost of a synthetic destination
+catalog held as parsed JSON records and as the compact catalog (catalog.py)
+
+Usage (from apps/backend):
+    python benchmarks/catalog_benchmark.py [--size 20000] [--activities 12] [--lookups 10000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import Catalog  # noqa: E402
+from normalization import normalize_destination  # noqa: E402
+
+
+def synthetic_destinations(size: int, activities: int) -> list:
+    rng = random.Random(42)
+    countries = [f"Country {i}" for i in range(200)]
+    words = ["castle", "lake", "museum", "market", "old town", "cathedral", "valley", "bridge", "harbour", "caves"]
+    return [{
+        "destination": f"Destination {i}",
+        "country": rng.choice(countries),
+        "description": f"A small town number {i} with {rng.choice(words)} and {rng.choice(words)}.",
+        "aliases": [f"Alias {i}"],
+        "activities": [{
+            "activity": f"Visit the {rng.choice(words)} of Destination {i}",
+            "description": f"Explore the {rng.choice(words)} and the {rng.choice(words)} around activity {j}."
+        } for j in range(activities)]
+    } for i in range(size)]
+
+
+def lookup_keys(destinations: list) -> dict:
+    keys = {}
+    for index, dest in enumerate(destinations):
+        for name in [dest["destination"], f"{dest['destination']}, {dest['country']}", *dest["aliases"]]:
+            keys.setdefault(normalize_destination(name), index)
+    return keys
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def heap_bytes(fn) -> int:
+    """Bytes allocated by fn() and still held by its result"""
+    tracemalloc.start()
+    result = fn()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=20000, help="Number of destinations")
+    parser.add_argument("--activities", type=int, default=12, help="Activities per destination")
+    parser.add_argument("--lookups", type=int, default=10000)
+    args = parser.parse_args()
+
+    destinations = synthetic_destinations(args.size, args.activities)
+    keys = lookup_keys(destinations)
+    directory = tempfile.mkdtemp(prefix="traivel-catalog-")
+    json_path = os.path.join(directory, "destinations.json")
+    catalog_path = os.path.join(directory, "destinations.catalog")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(destinations, f, ensure_ascii=False)
+    Catalog.save(catalog_path, destinations, keys)
+    del destinations
+
+    def load_json():
+        # The previous name index: every key maps to a fully parsed record
+        with open(json_path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        return {key: records[index] for key, index in keys.items()}
+
+    # Load times are measured without tracemalloc, which slows down allocations
+    name_index, json_seconds = timed(load_json)
+    catalog, catalog_seconds = timed(lambda: Catalog.load(catalog_path))
+    json_bytes = heap_bytes(load_json)
+    catalog_bytes = heap_bytes(lambda: Catalog.load(catalog_path))
+
+    rng = random.Random(7)
+    queries = [f"Destination {rng.randrange(args.size)}" for _ in range(args.lookups)]
+
+    def json_hits():
+        for query in queries:
+            record = name_index[normalize_destination(query)]
+            # Copied, because callers mutate the activities
+            {**record, "activities": [dict(activity) for activity in record["activities"]]}
+
+    def catalog_hits():
+        for query in queries:
+            catalog.record(catalog.find(query))
+
+    _, json_hit_seconds = timed(json_hits)
+    _, catalog_hit_seconds = timed(catalog_hits)
+
+    print(f"{args.size} destinations, {args.activities} activities each")
+    print(f"{'':<10} {'file MB':>8} {'load ms':>9} {'heap MB':>9} {'us/hit':>8}")
+    for name, path, seconds, heap, hit_seconds in [
+        ("json", json_path, json_seconds, json_bytes, json_hit_seconds),
+        ("catalog", catalog_path, catalog_seconds, catalog_bytes, catalog_hit_seconds)
+    ]:
+        print(f"{name:<10} {os.path.getsize(path) / 1e6:>8.1f} {seconds * 1000:>9.1f} {heap / 1e6:>9.1f}"
+              f" {hit_seconds / args.lookups * 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+# apps/backend/benchmarks/fakes.py
+"""
+Local stand-ins for Gemini, Google Places, OpenWeather and the embedding model
+
+Each fake sleeps for a configurable latency and fails at a configurable rate,
+so the backend can be benchmarked without network access or API keys.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import time
+from dataclasses import dataclass
+
+import googlemaps
+import httpx
+import numpy as np
+
+
+@dataclass
+class UpstreamProfile:
+    """Latency (seconds, +/- jitter) and error rate (0..1) of one fake upstream"""
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+
+    def delay(self, scale: float = 1.0) -> float:
+        return scale * (self.latency + random.uniform(-self.jitter, self.jitter))
+
+    def wait(self, scale: float = 1.0):
+        delay = self.delay(scale)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def async_wait(self, scale: float = 1.0):
+        delay = self.delay(scale)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def should_fail(self) -> bool:
+        return random.random() < self.error_rate
+
+
+def fake_activities(destination: str, count: int = 15, fields=("description", "link")) -> list:
+    activities = []
+    for i in range(count):
+        activity = {"activity": f"{destination} sight {i}"}
+        if "description" in fields:
+            activity["description"] = f"A well known place number {i} in {destination}."
+        if "link" in fields:
+            activity["link"] = f"https://example.com/{i}"
+        activities.append(activity)
+    return activities
+
+
+class FakeMessage:
+    def __init__(self, content: str, input_tokens: int = 200):
+        self.content = content
+        self.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": len(content) // 4,
+            "total_tokens": input_tokens + len(content) // 4,
+            # Like langchain-google-genai, which reports cached prompt tokens as a dict
+            "input_token_details": {"cache_read": 0}
+        }
+
+
+class FakeChain:
+    """
+    Replaces the prompt | Gemini chain (invoke, stream and ainvoke)
+
+    Responses follow the activity count and fields of the prompt, and the
+    latency of the profile is for the default 15 activities with all fields:
+    like Gemini's, it grows with the length of the output.
+    """
+
+    def __init__(self, profile: UpstreamProfile, activities: int = 15, stream_chunks: int = 20):
+        self.profile = profile
+        self.activities = activities
+        self.stream_chunks = stream_chunks
+        self._default_length = len(json.dumps(fake_activities("Somewhere", activities)))
+
+    def _response(self, prompt_input: dict) -> str:
+        activity_format = prompt_input.get("activity_format", '"description" "link"')
+        fields = [field for field in ("description", "link") if f'"{field}"' in activity_format]
+        count = int(prompt_input.get("count", self.activities))
+        return json.dumps(fake_activities(prompt_input.get("destination", "Somewhere"), count, fields))
+
+    def _scale(self, text: str) -> float:
+        return len(text) / self._default_length
+
+    def invoke(self, prompt_input: dict, *args, **kwargs) -> FakeMessage:
+        text = self._response(prompt_input)
+        self.profile.wait(self._scale(text))
+        if self.profile.should_fail():
+            raise RuntimeError("Fake Gemini error")
+        return FakeMessage(text)
+
+    async def ainvoke(self, prompt_input: dict, *args, **kwargs) -> FakeMessage:
+        text = self._response(prompt_input)
+        await self.profile.async_wait(self._scale(text))
+        if self.profile.should_fail():
+            raise RuntimeError("Fake Gemini error")
+        return FakeMessage(text)
+
+    def stream(self, prompt_input: dict, *args, **kwargs):
+        if self.profile.should_fail():
+            raise RuntimeError("Fake Gemini error")
+        text = self._response(prompt_input)
+        size = max(1, len(text) // self.stream_chunks)
+        delay = self.profile.delay(self._scale(text)) / self.stream_chunks
+        for start in range(0, len(text), size):
+            time.sleep(max(0.0, delay))
+            # Like Gemini's, each chunk reports the tokens it added
+            yield FakeMessage(text[start:start + size], input_tokens=200 if start == 0 else 0)
+
+
+def _place_id(text: str) -> str:
+    return "fake_" + hashlib.md5(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _text_search_response(query: str) -> dict:
+    return {"status": "OK", "results": [{"place_id": _place_id(query), "name": query}]}
+
+
+def _find_place_response(text: str) -> dict:
+    return {
+        "status": "OK",
+        "candidates": [{
+            "place_id": _place_id(text),
+            "name": text,
+            "photos": [{"photo_reference": "ref_" + _place_id(text)}]
+        }]
+    }
+
+
+def _details_response(place_id: str) -> dict:
+    return {
+        "status": "OK",
+        "result": {
+            "photos": [{"photo_reference": "ref_" + place_id}],
+            "website": f"https://example.com/{place_id}",
+            "url": f"https://maps.google.com/?cid={place_id}"
+        }
+    }
+
+
+_WEATHER_RESPONSE = {
+    "main": {"temp": 18.4, "humidity": 60},
+    "weather": [{"description": "scattered clouds"}],
+    "wind": {"speed": 3.1}
+}
+
+
+class FakeGmapsClient:
+    """Replaces googlemaps.Client for places, place and find_place"""
+
+    def __init__(self, profile: UpstreamProfile):
+        self.profile = profile
+
+    def _call(self):
+        self.profile.wait()
+        if self.profile.should_fail():
+            raise googlemaps.exceptions.ApiError("OVER_QUERY_LIMIT", "Fake quota error")
+
+    def places(self, query: str, **kwargs) -> dict:
+        self._call()
+        return _text_search_response(query)
+
+    def find_place(self, input: str, input_type: str, fields=None, **kwargs) -> dict:
+        self._call()
+        return _find_place_response(input)
+
+    def place(self, place_id: str, fields=None, **kwargs) -> dict:
+        self._call()
+        return _details_response(place_id)
+
+
+class FakePlacesTransport(httpx.AsyncBaseTransport):
+    """Serves the Places web service endpoints to the async client in places_service.py"""
+
+    def __init__(self, profile: UpstreamProfile):
+        self.profile = profile
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await self.profile.async_wait()
+        if self.profile.should_fail():
+            return httpx.Response(200, json={"status": "OVER_QUERY_LIMIT", "error_message": "Fake quota error"})
+        params = request.url.params
+        endpoint = request.url.path.rstrip("/").split("/")[-2]
+        if endpoint == "findplacefromtext":
+            return httpx.Response(200, json=_find_place_response(params.get("input", "")))
+        if endpoint == "textsearch":
+            return httpx.Response(200, json=_text_search_response(params.get("query", "")))
+        if endpoint == "details":
+            return httpx.Response(200, json=_details_response(params.get("place_id", "")))
+        return httpx.Response(404, json={"status": "NOT_FOUND"})
+
+
+class FakeWeatherResponse:
+    def __init__(self, status_code: int, payload: dict):
+        self.status_code = status_code
+        self._payload = payload
+
+    def json(self) -> dict:
+        return self._payload
+
+
+class FakeWeatherSession:
+    """Replaces the requests.Session used by weather.py"""
+
+    def __init__(self, profile: UpstreamProfile):
+        self.profile = profile
+
+    def get(self, url: str, params=None, **kwargs) -> FakeWeatherResponse:
+        self.profile.wait()
+        if self.profile.should_fail():
+            return FakeWeatherResponse(500, {"message": "Fake weather error"})
+        return FakeWeatherResponse(200, _WEATHER_RESPONSE)
+
+
+class FakeWeatherTransport(httpx.AsyncBaseTransport):
+    """Serves OpenWeather to the async client in weather.py"""
+
+    def __init__(self, profile: UpstreamProfile):
+        self.profile = profile
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await self.profile.async_wait()
+        if self.profile.should_fail():
+            return httpx.Response(500, json={"message": "Fake weather error"})
+        return httpx.Response(200, json=_WEATHER_RESPONSE)
+
+
+class FakeEmbeddingModel:
+    """
+    Deterministic character-trigram embeddings with the same shape and
+    normalization as all-MiniLM-L6-v2, for runs without the model downloaded
+    """
+    dimensions = 384
+
+    def encode(self, texts, batch_size: int = 32, **kwargs) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            text = f"  {text.lower()} "
+            for i in range(len(text) - 2):
+                digest = hashlib.md5(text[i:i + 3].encode("utf-8")).digest()
+                vectors[row, int.from_bytes(digest[:4], "little") % self.dimensions] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+def install_fakes(gemini: UpstreamProfile, places: UpstreamProfile, weather: UpstreamProfile,
+                  fake_embeddings: bool = True):
+    """Patch the backend modules to use the fakes. Import after setting up the environment."""
+    import ai_agent
+    import embedding_service
+    import http_clients
+    import places_service
+    import weather as weather_module
+
+    chain = FakeChain(gemini)
+    ai_agent.get_chain = lambda options=ai_agent.DEFAULT_PROMPT_OPTIONS: chain
+    places_service.GOOGLE_PLACES_API_KEY = "fake-key"
+    places_service._gmaps = FakeGmapsClient(places)
+    http_clients.set_transport("google_places", FakePlacesTransport(places))
+    weather_module.API_KEY = "fake-key"
+    weather_module._session = FakeWeatherSession(weather)
+    http_clients.set_transport("openweather", FakeWeatherTransport(weather))
+    if fake_embeddings:
+        embedding_service._embedding_model = FakeEmbeddingModel()
@@ -0,0 +1,158 @@
+# apps/backend/benchmarks/load_test.py
+"""
+Offline load test for /api/recommend against local fakes of Gemini, Places and OpenWeather
+
+Usage (from apps/backend):
+    python benchmarks/load_test.py [--requests 200] [--concurrency 20]
+        [--scenario rag-hit gemini no-images snapshot compact] [--gemini-latency 1.5] [--places-latency 0.15]
+        [--weather-latency 0.1] [--error-rate 0.0] [--repeat-destinations] [--real-embeddings]
+
+Scenarios:
+    rag-hit     curated destinations served from the RAG database
+    gemini      destinations unknown to RAG, generated by the (fake) Gemini chain
+    no-images   like gemini, with include_images=false
+    snapshot    curated destinations served from the materialized snapshot (manage.py materialize)
+    compact     like gemini, asking for 5 activities with links only (count and fields parameters)
+"""
+import argparse
+import asyncio
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Isolate the run from local caches and databases before the backend is imported
+_workdir = tempfile.mkdtemp(prefix="traivel-bench-")
+os.environ.update({
+    "WARMUP_ON_STARTUP": "false",
+    "GEMINI_API_KEY": "fake-key",
+    "CHROMA_PERSIST_DIRECTORY": os.path.join(_workdir, "chroma_db"),
+    "RAG_CATALOG_PATH": os.path.join(_workdir, "destinations.catalog"),
+    "RECOMMENDATION_CACHE_PATH": "",
+    "CURATED_SNAPSHOT_PATH": os.path.join(_workdir, "curated.snap"),
+    # The snapshot is written mid-run, right before the snapshot scenario
+    "SNAPSHOT_CHECK_INTERVAL": "0",
+    "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+})
+os.environ.pop("PLACES_CACHE_PATH", None)
+
+import httpx  # noqa: E402
+
+from fakes import UpstreamProfile, install_fakes  # noqa: E402
+
+SCENARIOS = ("rag-hit", "gemini", "no-images", "snapshot", "compact")
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def build_requests(scenario: str, total: int, repeat: bool, curated: list) -> list:
+    """Return the query parameters of every request of a scenario"""
+    if scenario in ("rag-hit", "snapshot"):
+        return [{"destination": curated[i % len(curated)]} for i in range(total)]
+    params = {"include_images": "false"} if scenario == "no-images" else {}
+    if scenario == "compact":
+        params = {"count": 5, "fields": "link"}
+    # Unique names defeat the caches unless --repeat-destinations is set
+    names = [f"Benchmark City {i % 10 if repeat else i} {scenario}" for i in range(total)]
+    return [{"destination": name, **params} for name in names]
+
+
+async def run_scenario(app, scenario: str, total: int, concurrency: int, repeat: bool, curated: list) -> dict:
+    requests = build_requests(scenario, total, repeat, curated)
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        async def one(params: dict):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get("/api/recommend", params=params)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200 or "error" in response.json():
+                    errors += 1
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        await asyncio.gather(*(one(params) for params in requests))
+        elapsed = time.perf_counter() - start
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "scenario": scenario,
+        "requests": total,
+        "errors": errors,
+        "throughput_rps": total / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "peak_traced_mb": peak_memory / 1024 / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--scenario", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--gemini-latency", type=float, default=1.5)
+    parser.add_argument("--places-latency", type=float, default=0.15)
+    parser.add_argument("--weather-latency", type=float, default=0.1)
+    parser.add_argument("--jitter", type=float, default=0.2, help="Latency jitter as a fraction of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Error rate of every fake upstream")
+    parser.add_argument("--repeat-destinations", action="store_true",
+                        help="Reuse 10 destinations per scenario to measure warm caches")
+    parser.add_argument("--real-embeddings", action="store_true",
+                        help="Use the real SentenceTransformer model (must be downloaded already)")
+    args = parser.parse_args()
+
+    def profile(latency: float) -> UpstreamProfile:
+        return UpstreamProfile(latency=latency, jitter=latency * args.jitter, error_rate=args.error_rate)
+
+    import main as backend
+    import rag_service
+
+    install_fakes(
+        gemini=profile(args.gemini_latency),
+        places=profile(args.places_latency),
+        weather=profile(args.weather_latency),
+        fake_embeddings=not args.real_embeddings
+    )
+    rag_service.sync_rag_database()
+    curated = [dest["destination"] for dest in rag_service.load_destinations_data()]
+
+    results = []
+    for scenario in args.scenario:
+        if scenario == "snapshot":
+            from snapshot_store import materialize_curated_snapshot
+            materialize_curated_snapshot()
+        results.append(asyncio.run(run_scenario(
+            backend.app, scenario, args.requests, args.concurrency, args.repeat_destinations, curated
+        )))
+
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"\n{'scenario':<10} {'reqs':>6} {'errors':>6} {'rps':>8} {'p50 ms':>8} "
+          f"{'p95 ms':>8} {'p99 ms':>8} {'peak MB':>8}")
+    for r in results:
+        print(f"{r['scenario']:<10} {r['requests']:>6} {r['errors']:>6} {r['throughput_rps']:>8.1f} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['peak_traced_mb']:>8.1f}")
+    print(f"\nProcess max RSS: {max_rss_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# apps/backend/benchmarks/microbench.py
+"""
+Microbenchmarks of the CPU-bound hot paths: RAG lookups and parsing of a
+typical 15-activity recommendation
+
+Usage (from apps/backend):
+    python benchmarks/microbench.py [--number 1000] [--real-embeddings]
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_workdir = tempfile.mkdtemp(prefix="traivel-bench-")
+os.environ.update({
+    "WARMUP_ON_STARTUP": "false",
+    "GEMINI_API_KEY": "fake-key",
+    "CHROMA_PERSIST_DIRECTORY": os.path.join(_workdir, "chroma_db"),
+    "RAG_CATALOG_PATH": os.path.join(_workdir, "destinations.catalog"),
+    "RECOMMENDATION_CACHE_PATH": "",
+    "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+})
+
+from fakes import FakeEmbeddingModel, fake_activities  # noqa: E402
+
+
+def report(name: str, fn, number: int):
+    # Best of 5 repeats, to reduce noise from the rest of the machine
+    best = min(timeit.repeat(fn, number=number, repeat=5)) / number
+    print(f"{name:<40} {best * 1e6:>10.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=1000, help="Calls per repeat")
+    parser.add_argument("--real-embeddings", action="store_true",
+                        help="Use the real SentenceTransformer model (must be downloaded already)")
+    args = parser.parse_args()
+
+    import embedding_service
+    import rag_service
+    from llm_output import JsonArrayStreamParser, parse_activities
+
+    if not args.real_embeddings:
+        embedding_service._embedding_model = FakeEmbeddingModel()
+    rag_service.sync_rag_database()
+    curated = rag_service.load_destinations_data()[0]["destination"]
+
+    payload = json.dumps(fake_activities("Lisbon"), indent=2)
+    fenced = f"```json\n{payload}\n```"
+    with_trailing_commas = fenced.replace('"\n  }', '",\n  }')
+
+    def parse_stream():
+        parser = JsonArrayStreamParser()
+        for start in range(0, len(fenced), 64):
+            parser.feed(fenced[start:start + 64])
+
+    counter = itertools.count()
+    pool = ThreadPoolExecutor(max_workers=16)
+
+    def concurrent_direct():
+        # 16 concurrent single-query forward passes, as before the micro-batcher
+        model = embedding_service.get_embedding_model()
+        list(pool.map(lambda i: model.encode([f"unknown place {next(counter)}"]), range(16)))
+
+    def concurrent_batched():
+        list(pool.map(lambda i: embedding_service.encode_queries([f"unknown place {next(counter)}"]), range(16)))
+
+    number = args.number
+    print(f"{'benchmark':<40} {'per call':>13}")
+    report("search_destination (exact match)", lambda: rag_service.search_destination(curated), number)
+    report("search_destination (semantic, cached)", lambda: rag_service.search_destination("sunny beach town"),
+           max(1, number // 10))
+    report("search_destination (semantic, uncached)",
+           lambda: rag_service.search_destination(f"sunny beach town {next(counter)}"), max(1, number // 10))
+    report("search_destinations_batch (10)",
+           lambda: rag_service.search_destinations_batch([f"unknown place {next(counter)}" for _ in range(10)]),
+           max(1, number // 100))
+    report("16 concurrent encodes (direct)", concurrent_direct, max(1, number // 100))
+    report("16 concurrent encodes (micro-batched)", concurrent_batched, max(1, number // 100))
+    report("json.loads (15 activities)", lambda: json.loads(payload), number)
+    report("parse_activities (fenced)", lambda: parse_activities(fenced), max(1, number // 10))
+    report("parse_activities (trailing commas)", lambda: parse_activities(with_trailing_commas),
+           max(1, number // 10))
+    report("JsonArrayStreamParser (64-char chunks)", parse_stream, max(1, number // 10))
+
+
+if __name__ == "__main__":
+    main()
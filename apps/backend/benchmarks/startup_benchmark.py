@@ -0,0 +1,62 @@
+# apps/backend/benchmarks/startup_benchmark.py
+"""
+Measure how long a fresh worker takes to import the app and to finish warm-up
+
+Usage (from apps/backend):
+    python benchmarks/startup_benchmark.py [--runs 5] [--skip-warmup]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter so module caches from earlier runs don't skew the numbers
+MEASURE_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter() - start
+warmup = None
+if {warmup}:
+    start = time.perf_counter()
+    main.warm_up()
+    warmup = time.perf_counter() - start
+print(json.dumps({{"import_s": imported, "warmup_s": warmup}}))
+"""
+
+
+def run_once(warmup: bool) -> dict:
+    env = dict(os.environ, WARMUP_ON_STARTUP="false")
+    result = subprocess.run(
+        [sys.executable, "-c", MEASURE_SCRIPT.format(warmup=warmup)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    # The app prints log lines; the measurement is the last line
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(name: str, values: list):
+    print(f"{name:>10}: median {statistics.median(values):.3f}s  "
+          f"min {min(values):.3f}s  max {max(values):.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--skip-warmup", action="store_true", help="Only measure 'import main'")
+    args = parser.parse_args()
+
+    results = [run_once(not args.skip_warmup) for _ in range(args.runs)]
+
+    print(f"Startup benchmark ({args.runs} runs)")
+    summarize("import", [r["import_s"] for r in results])
+    if not args.skip_warmup:
+        summarize("warm-up", [r["warmup_s"] for r in results])
+
+
+if __name__ == "__main__":
+    main()
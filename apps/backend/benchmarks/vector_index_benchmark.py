@@ -0,0 +1,98 @@
+# apps/backend/benchmarks/vector_index_benchmark.py
+"""
+Compare semantic search latency of the Chroma collection and the in-process
+numpy index (RAG_VECTOR_BACKEND=numpy) on a synthetic catalog
+
+Usage (from apps/backend):
+    python benchmarks/vector_index_benchmark.py [--size 2000] [--queries 200] [--batch 10]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_index import VectorIndex  # noqa: E402
+
+DIMENSIONS = 384  # all-MiniLM-L6-v2
+
+
+def random_unit_vectors(rng: np.random.Generator, count: int) -> np.ndarray:
+    vectors = rng.standard_normal((count, DIMENSIONS)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def time_queries(query_fn, queries: np.ndarray, batch: int) -> list:
+    """Latency in milliseconds of each call, `batch` queries per call"""
+    latencies = []
+    for start in range(0, len(queries), batch):
+        chunk = queries[start:start + batch]
+        begin = time.perf_counter()
+        query_fn(chunk)
+        latencies.append((time.perf_counter() - begin) * 1000)
+    return latencies
+
+
+def summary(name: str, latencies: list):
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"{name:<28} mean {statistics.mean(latencies):8.3f} ms   p50 {statistics.median(latencies):8.3f} ms"
+          f"   p95 {p95:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=2000, help="Number of destinations in the catalog")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=10, help="Queries per call in the batched run")
+    args = parser.parse_args()
+
+    import chromadb
+    from chromadb.config import Settings
+
+    rng = np.random.default_rng(42)
+    embeddings = random_unit_vectors(rng, args.size)
+    # Queries near catalog entries, like misspelled destination names
+    queries = embeddings[rng.integers(0, args.size, args.queries)] + 0.05 * random_unit_vectors(rng, args.queries)
+    ids = [f"dest_{i}" for i in range(args.size)]
+    metadatas = [{"destination": f"Destination {i}", "country": "Nowhere"} for i in range(args.size)]
+
+    workdir = tempfile.mkdtemp(prefix="traivel-vector-bench-")
+    client = chromadb.PersistentClient(path=os.path.join(workdir, "chroma"), settings=Settings(anonymized_telemetry=False))
+    collection = client.create_collection("bench")
+    for start in range(0, args.size, 1000):
+        collection.add(
+            ids=ids[start:start + 1000],
+            embeddings=embeddings[start:start + 1000].tolist(),
+            metadatas=metadatas[start:start + 1000]
+        )
+
+    VectorIndex.save(os.path.join(workdir, "index"), ids, embeddings, metadatas)
+    index = VectorIndex.load(os.path.join(workdir, "index"))
+
+    def chroma_query(chunk):
+        return collection.query(query_embeddings=chunk.tolist(), n_results=1)
+
+    def numpy_query(chunk):
+        return index.query(chunk, n_results=1)
+
+    # Same nearest neighbours and (up to float error) the same distances
+    chroma_result, numpy_result = chroma_query(queries), numpy_query(queries)
+    agreement = np.mean([a[0] == b[0] for a, b in zip(chroma_result["ids"], numpy_result["ids"])])
+    max_diff = max(abs(a[0] - b[0]) for a, b in zip(chroma_result["distances"], numpy_result["distances"]))
+    print(f"catalog: {args.size} destinations, {args.queries} queries")
+    print(f"top-1 agreement: {agreement:.1%}, max distance difference: {max_diff:.2e}\n")
+
+    summary("chroma (1 query)", time_queries(chroma_query, queries, 1))
+    summary("numpy (1 query)", time_queries(numpy_query, queries, 1))
+    summary(f"chroma ({args.batch} queries)", time_queries(chroma_query, queries, args.batch))
+    summary(f"numpy ({args.batch} queries)", time_queries(numpy_query, queries, args.batch))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,730 @@
+# apps/backend/cache.py
+"""
+Cache backends shared by the Places, weather and recommendation caches
+
+- TTLCache: in-process LRU
+- SQLiteCache: SQLite file in WAL mode, shared by the workers on one host
+- RedisCache: Redis-protocol server shared by all workers and hosts
+- TieredCache: in-process LRU in front of one of the shared backends
+
+All backends support namespaced keys, per-entry TTLs, bulk get_many/set_many
+and get_or_set, which protects against cache stampedes and can serve stale
+entries while they are recomputed in the background (stale-while-revalidate).
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Sentinel returned on cache miss (None and {} are valid cached values)
+MISSING = object()
+
+# "memory", "sqlite" (CACHE_PATH, shared by the workers on this host) or "redis" (CACHE_REDIS_URL)
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory").lower()
+CACHE_PATH = os.environ.get("CACHE_PATH", "./cache/shared.db")
+CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL", "redis://localhost:6379/0")
+# Seconds a worker keeps its own copy of a shared entry (0 = always ask the shared backend)
+CACHE_LOCAL_TTL = float(os.environ.get("CACHE_LOCAL_TTL", "30"))
+# How long one worker may compute a missing value while the others wait for it
+CACHE_LOCK_TIMEOUT = float(os.environ.get("CACHE_LOCK_TIMEOUT", "5"))
+
+# TTL argument of get_or_set: seconds, None for the cache default, or a
+# function of the computed value returning seconds or None to not cache it
+TTL = Union[float, None, Callable[[Any], Optional[float]]]
+
+# Recomputes stale entries for synchronous get_or_set callers
+_revalidate_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-revalidate")
+
+
+class Cache:
+    """
+    Base of the cache backends: bulk operations and stampede-protected
+    get_or_set on top of the backend's get/set
+    """
+
+    def __init__(self):
+        self._flight = SingleFlight()
+        self._async_flight = AsyncSingleFlight()
+        self._revalidating = set()
+        self._revalidating_lock = threading.Lock()
+        # Background revalidation tasks of aget_or_set, referenced until they finish
+        self._tasks = set()
+
+    def get(self, key: str, default: Any = MISSING) -> Any:
+        entry = self.get_entry(key)
+        if entry is MISSING:
+            return default
+        return entry[0]
+
+    def get_entry(self, key: str) -> Any:
+        """Return (value, remaining_ttl) or MISSING"""
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    def get_many_entries(self, keys: Iterable[str]) -> Dict[str, Tuple[Any, float]]:
+        """Return {key: (value, remaining_ttl)} for the keys that are cached"""
+        result = {}
+        for key in keys:
+            entry = self.get_entry(key)
+            if entry is not MISSING:
+                result[key] = entry
+        return result
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Return {key: value} for the keys that are cached"""
+        result = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not MISSING:
+                result[key] = value
+        return result
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None):
+        for key, value in items.items():
+            self.set(key, value, ttl)
+
+    def _acquire_lease(self, key: str) -> bool:
+        """Take the cross-process right to compute a key (always granted in-process)"""
+        return True
+
+    def _release_lease(self, key: str):
+        pass
+
+    def get_or_set(self, key: str, fn: Callable[[], Any], ttl: TTL = None, stale_ttl: float = 0) -> Any:
+        """
+        Return the cached value, or compute it with fn() and cache it
+
+        Concurrent callers in this process share one fn() call. On shared
+        backends one worker takes a lease on the key and the others wait up
+        to CACHE_LOCK_TIMEOUT seconds for its result before calling fn()
+        themselves.
+
+        With stale_ttl, values are kept stale_ttl seconds past their TTL.
+        A stale value is returned right away and recomputed in the
+        background (stale-while-revalidate).
+        """
+        entry = self.get_entry(key)
+        if entry is not MISSING:
+            value, remaining_ttl = entry
+            if stale_ttl and remaining_ttl <= stale_ttl:
+                self.revalidate(key, fn, ttl, stale_ttl)
+            return value
+        return self._flight.do(key, self._compute, key, fn, ttl, stale_ttl)
+
+    def refresh(self, key: str, fn: Callable[[], Any], ttl: TTL = None, stale_ttl: float = 0) -> Any:
+        """Compute the value with fn() and cache it, even if the key is cached (refresh-ahead)"""
+        return self._flight.do(key, self._compute, key, fn, ttl, stale_ttl)
+
+    def revalidate(self, key: str, fn: Callable[[], Any], ttl: TTL = None, stale_ttl: float = 0):
+        """refresh() in a background thread, at most once at a time per key"""
+        with self._revalidating_lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        def run():
+            try:
+                self.refresh(key, fn, ttl, stale_ttl)
+            except Exception as e:
+                logger.warning("Revalidating cache key %s failed: %s", key, e)
+            finally:
+                with self._revalidating_lock:
+                    self._revalidating.discard(key)
+
+        _revalidate_executor.submit(run)
+
+    def _compute(self, key: str, fn: Callable[[], Any], ttl: TTL, stale_ttl: float = 0) -> Any:
+        leased = self._acquire_lease(key)
+        if not leased:
+            value, leased = self._wait_for(key)
+            if value is not MISSING:
+                return value
+        try:
+            value = fn()
+            self._store(key, value, ttl, stale_ttl)
+            return value
+        finally:
+            if leased:
+                self._release_lease(key)
+
+    def _store(self, key: str, value: Any, ttl: TTL, stale_ttl: float = 0):
+        value_ttl = ttl(value) if callable(ttl) else ttl
+        if value_ttl is not None:
+            self.set(key, value, value_ttl + stale_ttl)
+        elif not callable(ttl):
+            self.set(key, value)
+
+    def _wait_for(self, key: str) -> Tuple[Any, bool]:
+        """
+        Wait for the lease holder's value. Returns (value, False), or
+        (MISSING, True) if the lease was released without a value and is now ours.
+        """
+        deadline = time.monotonic() + CACHE_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            value = self.get(key)
+            if value is not MISSING:
+                return value, False
+            if self._acquire_lease(key):
+                return MISSING, True
+        return MISSING, False
+
+    async def aget_or_set(self, key: str, fn: Callable[[], Awaitable[Any]], ttl: TTL = None,
+                          stale_ttl: float = 0) -> Any:
+        """
+        get_or_set for coroutines: fn() returns an awaitable, and callers
+        waiting for another caller or worker don't block the event loop.
+        Stale values are recomputed in a background task.
+        """
+        entry = self.get_entry(key)
+        if entry is not MISSING:
+            value, remaining_ttl = entry
+            if stale_ttl and remaining_ttl <= stale_ttl:
+                task = asyncio.ensure_future(self._arevalidate(key, fn, ttl, stale_ttl))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return value
+        return await self._async_flight.do(key, self._acompute, key, fn, ttl, stale_ttl)
+
+    async def _arevalidate(self, key: str, fn: Callable[[], Awaitable[Any]], ttl: TTL, stale_ttl: float):
+        try:
+            # Coalesced with the other revalidations of the key
+            await self._async_flight.do(key, self._acompute, key, fn, ttl, stale_ttl)
+        except Exception as e:
+            logger.warning("Revalidating cache key %s failed: %s", key, e)
+
+    async def _acompute(self, key: str, fn: Callable[[], Awaitable[Any]], ttl: TTL, stale_ttl: float = 0) -> Any:
+        leased = self._acquire_lease(key)
+        if not leased:
+            deadline = time.monotonic() + CACHE_LOCK_TIMEOUT
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+                value = self.get(key)
+                if value is not MISSING:
+                    return value
+                leased = self._acquire_lease(key)
+                if leased:
+                    break
+        try:
+            value = await fn()
+            self._store(key, value, ttl, stale_ttl)
+            return value
+        finally:
+            if leased:
+                self._release_lease(key)
+
+
+class TTLCache(Cache):
+    """Thread-safe in-process LRU cache where every entry has its own TTL"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600):
+        super().__init__()
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_entry(self, key: str) -> Any:
+        """Return (value, remaining_ttl) or MISSING"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+
+            value, expires_at = entry
+            remaining_ttl = expires_at - time.monotonic()
+            if remaining_ttl < 0:
+                del self._data[key]
+                self.misses += 1
+                return MISSING
+
+            # Mark as most recently used
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value, remaining_ttl
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0
+        }
+
+
+class SQLiteCache(Cache):
+    """
+    On-disk TTL cache backed by SQLite - survives restarts. Values must be JSON serializable.
+
+    The database runs in WAL mode, so the workers on one host can share a
+    file: readers don't block each other or the writer. Keys are stored
+    as "<namespace>:<key>", and maxsize applies per namespace.
+    """
+    tier = "disk"
+
+    def __init__(self, path: str, maxsize: int = 100_000, ttl: float = 3600, namespace: str = ""):
+        super().__init__()
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.namespace = namespace
+        self._prefix = f"{namespace}:" if namespace else ""
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        # Wait for other workers' write transactions instead of failing with "database is locked"
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache(accessed_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_leases (key TEXT PRIMARY KEY, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _namespace_range(self) -> Tuple[str, str]:
+        # Keys of this namespace sort between "<namespace>:" and "<namespace>;"
+        return self._prefix, (self._prefix[:-1] + ";") if self._prefix else "\U0010ffff"
+
+    def get_entry(self, key: str) -> Any:
+        """Return (value, remaining_ttl) or MISSING"""
+        return self.get_many_entries([key]).get(key, MISSING)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        return {key: value for key, (value, _) in self.get_many_entries(keys).items()}
+
+    def get_many_entries(self, keys: Iterable[str]) -> Dict[str, Tuple[Any, float]]:
+        """Return {key: (value, remaining_ttl)} for the cached keys, in one query"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        now = time.time()
+        stored_keys = [self._prefix + key for key in keys]
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, value, expires_at FROM cache WHERE key IN ({','.join('?' * len(keys))})",
+                stored_keys
+            ).fetchall()
+
+            entries = {}
+            expired = []
+            for stored_key, value, expires_at in rows:
+                if expires_at < now:
+                    expired.append((stored_key,))
+                else:
+                    entries[stored_key[len(self._prefix):]] = (json.loads(value), expires_at - now)
+
+            if expired:
+                self._conn.executemany("DELETE FROM cache WHERE key = ?", expired)
+            if entries:
+                self._conn.executemany(
+                    "UPDATE cache SET accessed_at = ? WHERE key = ?",
+                    [(now, self._prefix + key) for key in entries]
+                )
+            if expired or entries:
+                self._conn.commit()
+            self.hits += len(entries)
+            self.misses += len(keys) - len(entries)
+            return entries
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None):
+        """Store several entries in one transaction"""
+        if not items:
+            return
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                [(self._prefix + key, json.dumps(value), expires_at, now) for key, value in items.items()]
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        """Drop expired rows, then least recently used rows of the namespace above maxsize"""
+        self._conn.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+        start, end = self._namespace_range()
+        (count,) = self._conn.execute(
+            "SELECT COUNT(*) FROM cache WHERE key >= ? AND key < ?", (start, end)
+        ).fetchone()
+        if count > self.maxsize:
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                " SELECT key FROM cache WHERE key >= ? AND key < ? ORDER BY accessed_at ASC LIMIT ?)",
+                (start, end, count - self.maxsize)
+            )
+
+    def _acquire_lease(self, key: str) -> bool:
+        now = time.time()
+        stored_key = self._prefix + key
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_leases WHERE key = ? AND expires_at < ?", (stored_key, now))
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO cache_leases (key, expires_at) VALUES (?, ?)",
+                (stored_key, now + CACHE_LOCK_TIMEOUT)
+            )
+            self._conn.commit()
+            return cursor.rowcount == 1
+
+    def _release_lease(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_leases WHERE key = ?", (self._prefix + key,))
+            self._conn.commit()
+
+    def clear(self):
+        start, end = self._namespace_range()
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key >= ? AND key < ?", (start, end))
+            self._conn.commit()
+
+    def __len__(self):
+        start, end = self._namespace_range()
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM cache WHERE key >= ? AND key < ?", (start, end)
+            ).fetchone()
+        return count
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+            "path": self.path
+        }
+
+
+class RedisCache(Cache):
+    """
+    TTL cache in a Redis-protocol server (Redis, Valkey, KeyDB, ...) shared by
+    all workers and hosts. Values must be JSON serializable.
+
+    Needs the redis package unless `client` is given - any object with the
+    redis-py API works, e.g. fakeredis as a local stand-in. Size limits are
+    left to the server's maxmemory policy. Server errors are logged and
+    treated as cache misses, so an unavailable server never fails a request.
+    """
+    tier = "redis"
+
+    def __init__(self, url: str, namespace: str, ttl: float = 3600, client=None):
+        super().__init__()
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1)
+        self._client = client
+        self.ttl = ttl
+        self.namespace = namespace
+        self._prefix = f"traivel:{namespace}:"
+        self._lease_prefix = f"traivel:{namespace}#lease:"
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _failed(self, operation: str, error: Exception):
+        self.errors += 1
+        logger.warning("Redis cache %s (%s) failed: %s", operation, self.namespace, error)
+
+    def get_entry(self, key: str) -> Any:
+        """Return (value, remaining_ttl) or MISSING"""
+        return self.get_many_entries([key]).get(key, MISSING)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        return {key: value for key, (value, _) in self.get_many_entries(keys).items()}
+
+    def get_many_entries(self, keys: Iterable[str]) -> Dict[str, Tuple[Any, float]]:
+        """Return {key: (value, remaining_ttl)} for the cached keys, in one round trip"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for key in keys:
+                pipe.get(self._prefix + key)
+                pipe.pttl(self._prefix + key)
+            replies = pipe.execute()
+        except Exception as e:
+            self._failed("get", e)
+            self.misses += len(keys)
+            return {}
+
+        entries = {}
+        for key, value, pttl in zip(keys, replies[::2], replies[1::2]):
+            if value is not None:
+                # A negative PTTL means the key has no expiry
+                entries[key] = (json.loads(value), pttl / 1000 if pttl and pttl > 0 else self.ttl)
+        self.hits += len(entries)
+        self.misses += len(keys) - len(entries)
+        return entries
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None):
+        """Store several entries in one round trip"""
+        if not items:
+            return
+        milliseconds = max(1, int((self.ttl if ttl is None else ttl) * 1000))
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for key, value in items.items():
+                pipe.set(self._prefix + key, json.dumps(value), px=milliseconds)
+            pipe.execute()
+        except Exception as e:
+            self._failed("set", e)
+
+    def _acquire_lease(self, key: str) -> bool:
+        try:
+            return bool(self._client.set(
+                self._lease_prefix + key, b"1", nx=True, px=int(CACHE_LOCK_TIMEOUT * 1000)
+            ))
+        except Exception as e:
+            self._failed("lease", e)
+            return True
+
+    def _release_lease(self, key: str):
+        try:
+            self._client.delete(self._lease_prefix + key)
+        except Exception as e:
+            self._failed("lease", e)
+
+    def clear(self):
+        try:
+            keys = list(self._client.scan_iter(match=self._prefix + "*", count=1000))
+            if keys:
+                self._client.delete(*keys)
+        except Exception as e:
+            self._failed("clear", e)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            # Counting the keys of a namespace would need a full SCAN
+            "size": None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0
+        }
+
+
+class TieredCache(Cache):
+    """
+    In-process LRU in front of an optional shared tier (SQLiteCache or RedisCache)
+
+    Values read from the shared tier are kept in memory for the rest of
+    their lifetime, or at most `memory_ttl` seconds so that workers see
+    each other's updates.
+    """
+
+    def __init__(self, memory: TTLCache, shared: Optional[Cache] = None, memory_ttl: Optional[float] = None):
+        super().__init__()
+        self.memory = memory
+        self.shared = shared
+        self.memory_ttl = memory_ttl
+
+    def _remember(self, key: str, value: Any, ttl: Optional[float]):
+        if self.memory_ttl != 0:
+            ttl = self.memory.ttl if ttl is None else ttl
+            # The memory copy may expire earlier, but remembers when the entry itself expires
+            memory_ttl = ttl if self.memory_ttl is None else min(ttl, self.memory_ttl)
+            self.memory.set(key, (value, time.monotonic() + ttl), memory_ttl)
+
+    def get_entry(self, key: str) -> Any:
+        """Return (value, remaining_ttl) or MISSING"""
+        entry = self.memory.get(key)
+        if entry is not MISSING:
+            value, expires_at = entry
+            return value, expires_at - time.monotonic()
+
+        if self.shared is None:
+            return MISSING
+
+        entry = self.shared.get_entry(key)
+        if entry is not MISSING:
+            # Promote to the memory tier for the rest of the entry's lifetime
+            self._remember(key, *entry)
+        return entry
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        return {key: value for key, (value, _) in self.get_many_entries(keys).items()}
+
+    def get_many_entries(self, keys: Iterable[str]) -> Dict[str, Tuple[Any, float]]:
+        """Return the cached keys - memory first, then one bulk read of the shared tier"""
+        keys = list(keys)
+        now = time.monotonic()
+        result = {
+            key: (value, expires_at - now) for key, (value, expires_at) in self.memory.get_many(keys).items()
+        }
+        missing = [key for key in keys if key not in result]
+        if missing and self.shared is not None:
+            for key, (value, remaining_ttl) in self.shared.get_many_entries(missing).items():
+                self._remember(key, value, remaining_ttl)
+                result[key] = (value, remaining_ttl)
+        return result
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self._remember(key, value, ttl)
+        if self.shared is not None:
+            self.shared.set(key, value, ttl)
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None):
+        for key, value in items.items():
+            self._remember(key, value, ttl)
+        if self.shared is not None:
+            self.shared.set_many(items, ttl)
+
+    def _acquire_lease(self, key: str) -> bool:
+        return self.shared._acquire_lease(key) if self.shared is not None else True
+
+    def _release_lease(self, key: str):
+        if self.shared is not None:
+            self.shared._release_lease(key)
+
+    def clear(self):
+        self.memory.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self) -> dict:
+        stats = {"memory": self.memory.stats()}
+        if self.shared is not None:
+            stats[self.shared.tier] = self.shared.stats()
+        return stats
+
+
+def create_shared_cache(namespace: str, maxsize: int, ttl: float) -> Optional[Cache]:
+    """
+    Return the CACHE_BACKEND store for a namespace, or None for "memory"
+    (or when the redis package is missing)
+    """
+    if CACHE_BACKEND == "sqlite":
+        return SQLiteCache(CACHE_PATH, maxsize=maxsize, ttl=ttl, namespace=namespace)
+    if CACHE_BACKEND == "redis":
+        try:
+            return RedisCache(CACHE_REDIS_URL, namespace, ttl=ttl)
+        except ImportError:
+            logger.warning("CACHE_BACKEND=redis but the redis package is not installed, using memory")
+    elif CACHE_BACKEND != "memory":
+        logger.warning("Unknown CACHE_BACKEND %r, using memory", CACHE_BACKEND)
+    return None
+
+
+def create_cache(namespace: str, maxsize: int, ttl: float, path: Optional[str] = None) -> TieredCache:
+    """
+    Build the cache of a namespace: an in-process LRU of `maxsize` entries
+    in front of the CACHE_BACKEND store (kept for CACHE_LOCAL_TTL seconds
+    at most), or in front of a private SQLite file at `path` if the
+    backend is "memory"
+    """
+    memory = TTLCache(maxsize=maxsize, ttl=ttl)
+    shared = create_shared_cache(namespace, maxsize * 20, ttl)
+    if shared is not None:
+        return TieredCache(memory, shared, memory_ttl=CACHE_LOCAL_TTL)
+    if path:
+        return TieredCache(memory, SQLiteCache(path, maxsize=maxsize * 20, ttl=ttl, namespace=namespace))
+    return TieredCache(memory)
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one in-flight call"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key: str, fn, *args, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {"event": threading.Event(), "result": None, "error": None}
+                self._calls[key] = call
+
+        if not leader:
+            # Someone else is already fetching this key - wait for their result
+            call["event"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = fn(*args, **kwargs)
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["event"].set()
+
+
+class AsyncSingleFlight:
+    """
+    Coalesce concurrent coroutine calls for the same key into one task
+
+    Callers that are cancelled (e.g. the client disconnected) don't cancel
+    the shared task, so the remaining callers still get the result.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.coalesced = 0
+
+    async def do(self, key: str, fn, *args, **kwargs) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
@@ -0,0 +1,184 @@
+# apps/backend/catalog.py
+"""
+Compact, read-only catalog of the RAG destinations
+
+Destinations and activities are stored column-wise as uint32 arrays that
+point into one string table, so repeated strings (countries, empty links,
+shared activity names) are stored once. The file is memory-mapped and the
+columns are used in place, so loading only decodes the lookup keys, and the
+pages are shared by all workers on a host. A destination is only turned into
+a dict when it is returned by a lookup.
+
+File layout (all integers little-endian uint32):
+    8 bytes   magic b"TRVCAT01"
+    header    destinations, activities, strings, keys, key text length
+    columns   string offsets (strings + 1)
+              destination name, country, description (destinations each)
+              destination first activity (destinations + 1)
+              activity name, description, link (activities each)
+              key destination (keys)
+    key text  lookup keys joined by "\n", UTF-8
+    strings   string table, UTF-8 (string i is bytes offsets[i]:offsets[i + 1])
+"""
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+from normalization import fold_accents, normalize_destination
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TRVCAT01"
+_HEADER = struct.Struct("<5I")
+
+
+def _uint32_bytes(values) -> bytes:
+    column = array("I", values)
+    if sys.byteorder != "little":
+        column.byteswap()
+    return column.tobytes()
+
+
+class Catalog:
+    """Memory-mapped destination catalog written by Catalog.save()"""
+
+    def __init__(self, buffer):
+        if bytes(buffer[:len(MAGIC)]) != MAGIC:
+            raise ValueError("not a destination catalog")
+        self._buffer = buffer
+        destinations, activities, strings, keys, key_text_length = _HEADER.unpack_from(buffer, len(MAGIC))
+        position = len(MAGIC) + _HEADER.size
+
+        def column(length: int):
+            nonlocal position
+            start, position = position, position + 4 * length
+            if sys.byteorder == "little":
+                return memoryview(buffer)[start:position].cast("I")
+            values = array("I", bytes(buffer[start:position]))
+            values.byteswap()
+            return values
+
+        self._string_offsets = column(strings + 1)
+        self._names = column(destinations)
+        self._countries = column(destinations)
+        self._descriptions = column(destinations)
+        self._first_activity = column(destinations + 1)
+        self._activity_names = column(activities)
+        self._activity_descriptions = column(activities)
+        self._activity_links = column(activities)
+        key_destinations = column(keys)
+
+        key_text = str(memoryview(buffer)[position:position + key_text_length], "utf-8")
+        self._strings_start = position + key_text_length
+        self._keys: Dict[str, int] = dict(zip(key_text.split("\n"), key_destinations)) if keys else {}
+        self.activities = activities
+        self.nbytes = len(buffer)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["Catalog"]:
+        """Memory-map a catalog file, or return None if there is none"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning("Could not load destination catalog from %s: %s", path, e)
+            return None
+
+    @staticmethod
+    def build(records: Iterable[Dict], keys: Dict[str, int]) -> bytes:
+        """
+        Serialize destination records (destination, country, description,
+        activities) and their lookup keys (key -> index into records)
+        """
+        table: Dict[str, int] = {"": 0}
+
+        def intern(text: Optional[str]) -> int:
+            text = text or ""
+            index = table.get(text)
+            if index is None:
+                index = table[text] = len(table)
+            return index
+
+        names, countries, descriptions, first_activity = [], [], [], [0]
+        activity_names, activity_descriptions, activity_links = [], [], []
+        for record in records:
+            names.append(intern(record['destination']))
+            countries.append(intern(record['country']))
+            descriptions.append(intern(record.get('description')))
+            for activity in record.get('activities', []):
+                activity_names.append(intern(activity['activity']))
+                activity_descriptions.append(intern(activity.get('description')))
+                activity_links.append(intern(activity.get('link')))
+            first_activity.append(len(activity_names))
+
+        encoded = [text.encode("utf-8") for text in table]
+        string_offsets = [0]
+        for text in encoded:
+            string_offsets.append(string_offsets[-1] + len(text))
+        key_text = "\n".join(keys).encode("utf-8")
+
+        return b"".join([
+            MAGIC,
+            _HEADER.pack(len(names), len(activity_names), len(encoded), len(keys), len(key_text)),
+            _uint32_bytes(string_offsets),
+            _uint32_bytes(names), _uint32_bytes(countries), _uint32_bytes(descriptions),
+            _uint32_bytes(first_activity),
+            _uint32_bytes(activity_names), _uint32_bytes(activity_descriptions), _uint32_bytes(activity_links),
+            _uint32_bytes(keys.values()),
+            key_text,
+            *encoded
+        ])
+
+    @classmethod
+    def save(cls, path: str, records: Iterable[Dict], keys: Dict[str, int]):
+        """Write a catalog to a temporary file and atomically move it into place"""
+        data = cls.build(records, keys)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def find(self, query: str) -> Optional[int]:
+        """Index of the destination with this name, alias or "name, country" (accents optional), or None"""
+        key = normalize_destination(query)
+        index = self._keys.get(key)
+        if index is None:
+            index = self._keys.get(fold_accents(key))
+        return index
+
+    def record(self, index: int) -> Dict:
+        """Materialize one destination as a new dict (callers may modify it)"""
+        buffer, offsets, base = self._buffer, self._string_offsets, self._strings_start
+
+        def string(i: int) -> str:
+            return buffer[base + offsets[i]:base + offsets[i + 1]].decode("utf-8")
+
+        first, last = self._first_activity[index], self._first_activity[index + 1]
+        activities: List[Dict] = [
+            # Empty links are filled in by Google Places enrichment
+            {"activity": string(name), "description": string(description), "link": string(link)}
+            for name, description, link in zip(
+                self._activity_names[first:last], self._activity_descriptions[first:last],
+                self._activity_links[first:last]
+            )
+        ]
+        return {
+            "destination": string(self._names[index]),
+            "country": string(self._countries[index]),
+            "description": string(self._descriptions[index]),
+            "activities": activities
+        }
+
+    def stats(self) -> dict:
+        return {"destinations": len(self), "activities": self.activities, "keys": len(self._keys),
+                "bytes": self.nbytes}
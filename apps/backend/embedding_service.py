@@ -0,0 +1,171 @@
+# apps/backend/embedding_service.py
+"""
+Owner of the SentenceTransformer model and the query-embedding path
+
+Query embeddings are cached per normalized text, and concurrent cache misses
+are grouped by a micro-batcher into one batched encode() call on a dedicated
+encoder thread instead of many single-item forward passes.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List
+
+import numpy as np
+
+from cache import MISSING, TTLCache
+from metrics import Histogram, track_stage
+from normalization import normalize_destination
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# Query embeddings never go stale - the cache is a plain LRU
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", "4096"))
+# How long the encoder waits for more requests to join a batch (0 = only batch requests
+# that queued up while the previous batch was encoding), and the batch size limit
+EMBEDDING_BATCH_WINDOW_MS = float(os.environ.get("EMBEDDING_BATCH_WINDOW_MS", "2"))
+EMBEDDING_MAX_BATCH = int(os.environ.get("EMBEDDING_MAX_BATCH", "32"))
+# torch intra-op threads used by the model (0 = torch default, one per core)
+EMBEDDING_THREADS = int(os.environ.get("EMBEDDING_THREADS", "0"))
+# Dynamically quantize the model's Linear layers to int8 (faster on CPU, slightly less accurate)
+EMBEDDING_QUANTIZE = os.environ.get("EMBEDDING_QUANTIZE", "false").lower() in ("1", "true", "yes")
+
+EMBEDDING_BATCH_SIZE = Histogram(
+    "traivel_embedding_batch_size",
+    "Number of queries embedded per encode() call of the micro-batcher",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+
+# The model is expensive to import and load, so it is created on first use (or by warm-up)
+_embedding_model = None
+_model_lock = threading.Lock()
+
+_query_cache = TTLCache(maxsize=EMBEDDING_CACHE_SIZE, ttl=float("inf"))
+
+
+def get_embedding_model():
+    """Return the SentenceTransformer model, loading it on first use"""
+    global _embedding_model
+    if _embedding_model is None:
+        with _model_lock:
+            if _embedding_model is None:
+                from sentence_transformers import SentenceTransformer
+                logger.info("Loading embedding model %s...", EMBEDDING_MODEL_NAME)
+                model = SentenceTransformer(EMBEDDING_MODEL_NAME, device="cpu")
+                if EMBEDDING_THREADS > 0:
+                    import torch
+                    torch.set_num_threads(EMBEDDING_THREADS)
+                if EMBEDDING_QUANTIZE:
+                    import torch
+                    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+                    logger.info("Embedding model quantized to int8")
+                _embedding_model = model
+    return _embedding_model
+
+
+def is_embedding_model_loaded() -> bool:
+    return _embedding_model is not None
+
+
+def get_embedding_cache_stats() -> dict:
+    """Return hit/miss counters of the query-embedding cache"""
+    return _query_cache.stats()
+
+
+class MicroBatcher:
+    """
+    Groups texts submitted by concurrent callers into batched encode() calls
+
+    A single daemon thread takes the first waiting submission, collects more
+    for up to EMBEDDING_BATCH_WINDOW_MS (or until EMBEDDING_MAX_BATCH texts),
+    and encodes them together. The texts of one submission are never split,
+    so a submission larger than the limit is encoded on its own in one call.
+    """
+
+    def __init__(self, window_ms: float, max_batch: int):
+        self.window = window_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        # Submission that did not fit into the previous batch (encoder thread only)
+        self._next = None
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._thread_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="embedding-encoder", daemon=True)
+                    self._thread.start()
+
+    def submit(self, texts: List[str]) -> List[Future]:
+        """Queue texts to be encoded in the same batch; each future resolves to one embedding"""
+        self._ensure_started()
+        futures = [Future() for _ in texts]
+        self._queue.put(list(zip(texts, futures)))
+        return futures
+
+    def _collect(self) -> list:
+        batch, self._next = self._next or self._queue.get(), None
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                items = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if len(batch) + len(items) > self.max_batch:
+                self._next = items
+                break
+            batch.extend(items)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # The same text may be waited on by several callers
+            texts = list(dict.fromkeys(text for text, _ in batch))
+            try:
+                model = get_embedding_model()
+                EMBEDDING_BATCH_SIZE.observe(len(texts))
+                embeddings = dict(zip(texts, model.encode(texts, batch_size=len(texts))))
+            except Exception as e:
+                logger.exception("Embedding batch of %d failed: %s", len(texts), e)
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for text, future in batch:
+                future.set_result(embeddings[text])
+
+
+_batcher = MicroBatcher(EMBEDDING_BATCH_WINDOW_MS, EMBEDDING_MAX_BATCH)
+
+
+def encode_queries(queries: List[str]) -> np.ndarray:
+    """
+    Embed search queries (destination names), one row per query
+
+    Queries are normalized first, so "Paris" and " paris " share a cache
+    entry (the model is uncased). Cache misses go through the micro-batcher
+    together, so they are encoded in one call however many there are.
+    """
+    keys = [normalize_destination(query) for query in queries]
+    vectors = [_query_cache.get(key) for key in keys]
+
+    misses = list(dict.fromkeys(key for key, vector in zip(keys, vectors) if vector is MISSING))
+    pending = dict(zip(misses, _batcher.submit(misses))) if misses else {}
+
+    if pending:
+        with track_stage("embedding_encode"):
+            for key, future in pending.items():
+                _query_cache.set(key, future.result())
+
+    return np.stack([
+        pending[key].result() if vector is MISSING else vector
+        for key, vector in zip(keys, vectors)
+    ]).astype(np.float32, copy=False)
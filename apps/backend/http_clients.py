@@ -0,0 +1,83 @@
+# apps/backend/http_clients.py
+"""
+Pooled async HTTP clients, one per upstream
+
+Each upstream gets its own httpx.AsyncClient with keep-alive connection
+pooling, and HTTP/2 when the h2 package is installed (pip install
+'httpx[http2]'). Clients are created on first use inside the running event
+loop and closed by the app lifespan. Cancelling the awaiting task (e.g. the
+client disconnected) cancels the request.
+"""
+import asyncio
+import importlib.util
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Use HTTP/2 if the h2 package is installed
+HTTP2_ENABLED = os.environ.get("HTTP2_ENABLED", "true").lower() in ("1", "true", "yes")
+# Idle connections kept open per upstream, and for how long (seconds)
+HTTP_MAX_KEEPALIVE = int(os.environ.get("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", "30"))
+
+# Clients by upstream name, with the event loop they belong to
+_clients: Dict[str, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+# Custom transports by upstream name (fakes in benchmarks and tests)
+_transports: Dict[str, httpx.AsyncBaseTransport] = {}
+
+
+def _http2_available() -> bool:
+    return HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
+
+def set_transport(name: str, transport: Optional[httpx.AsyncBaseTransport]):
+    """Send an upstream's requests through a custom transport (None restores the network)"""
+    if transport is None:
+        _transports.pop(name, None)
+    else:
+        _transports[name] = transport
+    _clients.pop(name, None)
+
+
+def get_client(name: str, timeout: httpx.Timeout, max_connections: int = 20) -> httpx.AsyncClient:
+    """
+    Return the pooled client of an upstream, creating it in the running event loop
+
+    Args:
+        timeout: Default timeout of the client's requests (per-call timeouts
+                 can still be passed to each request)
+        max_connections: Connections open at the same time - requests beyond
+                         that wait for a free connection
+    """
+    loop = asyncio.get_running_loop()
+    entry = _clients.get(name)
+    if entry is None or entry[0] is not loop:
+        # Connections of a client can't be used from another event loop
+        http2 = _http2_available()
+        client = httpx.AsyncClient(
+            http2=http2,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=min(HTTP_MAX_KEEPALIVE, max_connections),
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+            ),
+            transport=_transports.get(name)
+        )
+        entry = (loop, client)
+        _clients[name] = entry
+        logger.debug("Created HTTP client for %s (http2=%s)", name, http2)
+    return entry[1]
+
+
+async def close_clients():
+    """Close the clients of the running event loop"""
+    loop = asyncio.get_running_loop()
+    for name, (client_loop, client) in list(_clients.items()):
+        if client_loop is loop:
+            await client.aclose()
+        _clients.pop(name, None)
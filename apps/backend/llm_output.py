@@ -0,0 +1,215 @@
+# apps/backend/llm_output.py
+import json
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from pydantic import ValidationError
+
+from schemas import Activity
+
+
+def validate_activity(item: dict) -> Optional[dict]:
+    """Return the activity if it matches the Activity schema, None otherwise"""
+    try:
+        return Activity.model_validate(item).model_dump(exclude_none=True)
+    except ValidationError:
+        return None
+
+
+def strip_trailing_commas(text: str) -> str:
+    """Remove commas directly before a closing brace or bracket, outside of strings"""
+    result = []
+    pending_comma = None
+    in_string = False
+    escape = False
+
+    for char in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            result.append(char)
+            continue
+
+        if pending_comma is not None:
+            if char.isspace():
+                pending_comma.append(char)
+                continue
+            if char not in "}]":
+                result.append(",")
+            result.extend(pending_comma[1:])
+            pending_comma = None
+
+        if char == ",":
+            pending_comma = [","]
+        else:
+            if char == '"':
+                in_string = True
+            result.append(char)
+
+    if pending_comma is not None:
+        result.extend(pending_comma)
+    return "".join(result)
+
+
+class JsonArrayStreamParser:
+    """
+    Incremental parser for a JSON array of objects streamed by the LLM.
+
+    Text is fed chunk by chunk; every top-level object is returned as soon as
+    its closing brace arrives. Anything before the opening bracket (code
+    fences, prose) and after the closing bracket is ignored. Objects with
+    trailing commas are repaired; objects that still fail to decode or fail
+    validation, and an object truncated by the end of the stream, are dropped
+    and counted.
+    """
+
+    def __init__(self, validate: Optional[Callable[[dict], Optional[dict]]] = None):
+        self._validate = validate
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self._finished = False
+        self._closed = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._object_start = None
+        self.items = 0
+        self.repaired = 0
+        self.dropped = 0
+
+    @property
+    def finished(self) -> bool:
+        """True once the closing bracket of the array has been seen"""
+        return self._finished
+
+    def feed(self, text: str) -> List[dict]:
+        """Consume a chunk of text and return the objects completed by it"""
+        if self._finished or self._closed or not text:
+            return []
+
+        self._buffer += text
+        completed = []
+
+        while self._pos < len(self._buffer):
+            char = self._buffer[self._pos]
+
+            if not self._started:
+                if char == "[":
+                    self._started = True
+                self._pos += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if self._depth == 0 and char == "{":
+                    self._object_start = self._pos
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 0 and char == "]":
+                    self._finished = True
+                    self._pos += 1
+                    break
+                self._depth -= 1
+                if self._depth == 0 and self._object_start is not None:
+                    item = self._decode(self._buffer[self._object_start:self._pos + 1])
+                    if item is not None:
+                        completed.append(item)
+                    self._object_start = None
+
+            self._pos += 1
+
+        self._compact()
+        return completed
+
+    def close(self):
+        """Mark the end of the stream, counting an object cut off mid-way as dropped"""
+        if not self._closed and self._object_start is not None:
+            self.dropped += 1
+        self._closed = True
+        self._buffer = ""
+        self._pos = 0
+        self._object_start = None
+
+    def _decode(self, raw: str):
+        repaired = False
+        try:
+            item = json.loads(raw)
+        except json.JSONDecodeError:
+            try:
+                item = json.loads(strip_trailing_commas(raw))
+            except json.JSONDecodeError:
+                self.dropped += 1
+                return None
+            repaired = True
+        if not isinstance(item, dict):
+            self.dropped += 1
+            return None
+        if self._validate is not None:
+            item = self._validate(item)
+            if item is None:
+                self.dropped += 1
+                return None
+        self.items += 1
+        self.repaired += repaired
+        return item
+
+    def _compact(self):
+        """Drop consumed text so the buffer only holds the object being parsed"""
+        keep_from = self._object_start if self._object_start is not None else self._pos
+        if keep_from > 0:
+            self._buffer = self._buffer[keep_from:]
+            self._pos -= keep_from
+            if self._object_start is not None:
+                self._object_start = 0
+
+
+@dataclass
+class ParsedActivities:
+    activities: List[dict] = field(default_factory=list)
+    # Objects that could not be decoded, failed validation or were truncated
+    dropped: int = 0
+    # Objects that only decoded after removing trailing commas
+    repaired: int = 0
+    # False if the array was never closed, e.g. the generation was cut off
+    complete: bool = False
+
+
+def parse_activities(text: str) -> ParsedActivities:
+    """
+    Recover every valid activity from an LLM response
+
+    Tolerates prose and code fences around the array, trailing commas and a
+    truncated final element. Never raises; an unusable response yields no
+    activities.
+    """
+    # Fast path: RAG data, cached responses and JSON-mode output are a clean array
+    try:
+        items = json.loads(text)
+    except ValueError:
+        items = None
+    if isinstance(items, list):
+        activities = []
+        for item in items:
+            activity = validate_activity(item) if isinstance(item, dict) else None
+            if activity is not None:
+                activities.append(activity)
+        return ParsedActivities(activities, len(items) - len(activities), 0, True)
+
+    parser = JsonArrayStreamParser(validate=validate_activity)
+    activities = parser.feed(text)
+    complete = parser.finished
+    parser.close()
+    return ParsedActivities(activities, parser.dropped, parser.repaired, complete)
@@ -1,15 +1,108 @@
-from fastapi import FastAPI, Query
-from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from ai_agent import get_ai_recommendation
-from places_service import get_place_info_batch
-from weather import get_weather
-import json
 
-# Load environment variables from .env file
+# Load environment variables from .env file (before the modules below read them)
 load_dotenv()
 
-app = FastAPI(title="trAIvel Backend API")
+from logging_config import configure_logging
+
+configure_logging()
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional, Tuple, Union
+import ai_agent
+import places_service
+import rag_service
+from ai_agent import (
+    ACTIVITY_FIELDS, DEFAULT_ACTIVITY_COUNT, MAX_ACTIVITY_COUNT, PromptOptions,
+    aget_ai_recommendation, stream_ai_recommendation
+)
+from cache import AsyncSingleFlight
+from llm_output import JsonArrayStreamParser, parse_activities, validate_activity
+from metrics import (
+    HTTP_REQUEST_DURATION, HTTP_REQUESTS, cache_stats_collector, register_collector, render_metrics,
+    start_request_timing, track_stage
+)
+from embedding_service import get_embedding_cache_stats
+from normalization import normalize_destination
+from profiling import (
+    PROFILE_MAX_SECONDS, PROFILING_ENABLED, ProfilerBusy, log_slow_request, sample_stacks, server_timing_header
+)
+from resilience import get_upstream_states, upstream_state_collector
+from http_clients import close_clients
+from places_service import aget_place_info_batch, build_search_url, get_places_cache_stats, submit_enrich_activity
+from schemas import RESPONSE_VERSION, LegacyRecommendationResponse, RecommendationResponse
+from snapshot_store import curated_store, get_curated_destination
+from weather import (
+    aget_weather, get_cached_weather, get_weather, get_weather_cache_stats, refresh_weather_in_background
+)
+from recommendation_cache import recommendation_cache
+from refresh_ahead import REFRESH_AHEAD_ENABLED, refresh_scheduler
+import asyncio
+import json
+import logging
+import orjson
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Batch endpoint limits
+BATCH_MAX_DESTINATIONS = int(os.getenv("BATCH_MAX_DESTINATIONS", "200"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+
+# Response compression: "gzip", "brotli" (needs brotli-asgi, falls back to gzip) or "none"
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "gzip").lower()
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1000"))
+
+# fields parameter: comma-separated optional activity fields ("" = activity names only)
+_FIELD_NAMES = "|".join(ACTIVITY_FIELDS)
+FIELDS_PATTERN = f"^(({_FIELD_NAMES})(,({_FIELD_NAMES}))*)?$"
+COUNT_DESCRIPTION = "Number of activities to return"
+FIELDS_DESCRIPTION = "Comma-separated activity fields to return besides the name: description, link"
+
+# Streamed responses opt out of compression - the compressor would buffer events
+STREAM_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Content-Encoding": "identity"}
+
+# Load the embedding model, vector DB and API clients in the background at startup
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+_warmup_state = {"started": False, "finished": False, "error": None, "duration_s": None}
+
+def warm_up():
+    """Initialize all lazily-constructed heavy dependencies"""
+    _warmup_state["started"] = True
+    start = time.perf_counter()
+    try:
+        curated_store.current()
+        rag_service.warm_up()
+        places_service.get_gmaps_client()
+        ai_agent.get_chain()
+    except Exception as e:
+        logger.exception("Warm-up failed: %s: %s", type(e).__name__, e)
+        _warmup_state["error"] = str(e)
+    _warmup_state["duration_s"] = round(time.perf_counter() - start, 3)
+    _warmup_state["finished"] = True
+    logger.info("Warm-up finished in %ss", _warmup_state['duration_s'])
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARMUP_ON_STARTUP:
+        # Daemon thread so the server accepts requests (and /api/health answers) immediately
+        threading.Thread(target=warm_up, name="warmup", daemon=True).start()
+    if REFRESH_AHEAD_ENABLED:
+        refresh_scheduler.start()
+    yield
+    refresh_scheduler.stop()
+    # Close the pooled upstream HTTP clients (created on first use)
+    await close_clients()
+
+app = FastAPI(title="trAIvel Backend API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,6 +112,78 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def _add_compression(app: FastAPI):
+    if RESPONSE_COMPRESSION == "brotli":
+        try:
+            from brotli_asgi import BrotliMiddleware
+            app.add_middleware(BrotliMiddleware, minimum_size=COMPRESSION_MIN_SIZE, gzip_fallback=True)
+            return
+        except ImportError:
+            logger.warning("RESPONSE_COMPRESSION=brotli but brotli-asgi is not installed, using gzip")
+    if RESPONSE_COMPRESSION != "none":
+        app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+
+_add_compression(app)
+
+register_collector(cache_stats_collector("places", get_places_cache_stats))
+register_collector(cache_stats_collector("weather", get_weather_cache_stats))
+register_collector(cache_stats_collector("recommendations", recommendation_cache.stats))
+register_collector(cache_stats_collector("query_embeddings", get_embedding_cache_stats))
+register_collector(cache_stats_collector("curated_snapshot", curated_store.stats))
+register_collector(upstream_state_collector)
+
+# Concurrent /api/recommend calls for the same destination share one computation
+_recommend_flight = AsyncSingleFlight()
+register_collector(lambda: [("traivel_coalesced_requests_total", "counter", {}, _recommend_flight.coalesced)])
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    # Set before call_next so the endpoint's task inherits it
+    stages = start_request_timing() if PROFILING_ENABLED else None
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        if stages is not None:
+            # Streamed responses only cover the work done before the first byte
+            response.headers["Server-Timing"] = server_timing_header(stages, time.perf_counter() - start)
+        return response
+    finally:
+        duration = time.perf_counter() - start
+        # Label by route template, not raw path, to keep label cardinality bounded
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        HTTP_REQUESTS.inc(method=request.method, route=route_path, status=status)
+        HTTP_REQUEST_DURATION.observe(duration, method=request.method, route=route_path)
+        if stages is not None and route_path != "/api/debug/profile":
+            log_slow_request(request.method, route_path, status, duration, stages)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/debug/profile", include_in_schema=False)
+async def profile(
+    seconds: float = Query(default=10, gt=0, le=PROFILE_MAX_SECONDS),
+    interval_ms: int = Query(default=10, ge=1, le=1000),
+    mode: str = Query(default="cpu", pattern="^(cpu|wall)$")
+):
+    """
+    Sample the stacks of this worker for `seconds` and return them as
+    collapsed stacks for flamegraph.pl or speedscope (PROFILING_ENABLED only)
+    """
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    try:
+        collapsed = await asyncio.to_thread(sample_stacks, seconds, interval_ms / 1000, mode)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(
+        collapsed, headers={"Content-Disposition": 'attachment; filename="profile.collapsed"'}
+    )
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to trAIvel API"}
@@ -27,86 +192,336 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
-def clean_json_response(text: str) -> str:
-    """Clean JSON response from LLM - remove markdown code blocks"""
-    # Remove ```json and ``` markers
-    text = text.strip()
-    if text.startswith('```json'):
-        text = text[7:]  # Remove ```json
-    elif text.startswith('```'):
-        text = text[3:]  # Remove ```
-    
-    if text.endswith('```'):
-        text = text[:-3]  # Remove trailing ```
-    
-    return text.strip()
+@app.get("/api/ready")
+async def readiness_check():
+    """Report whether the heavy dependencies are loaded - 503 until they are"""
+    components = {
+        "embedding_model": rag_service.is_embedding_model_loaded(),
+        "vector_db": rag_service.is_vector_db_ready(),
+        "llm": ai_agent.is_llm_initialized()
+    }
+    ready = components["embedding_model"] and components["vector_db"]
+    body = {
+        "status": "ready" if ready else "starting",
+        "components": components,
+        "upstreams": get_upstream_states(),
+        "warmup": _warmup_state
+    }
+    return ORJSONResponse(body, status_code=200 if ready else 503)
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    return {
+        "places": get_places_cache_stats(),
+        "weather": get_weather_cache_stats(),
+        "recommendations": recommendation_cache.stats(),
+        "query_embeddings": get_embedding_cache_stats(),
+        "curated_snapshot": curated_store.stats(),
+        "refresh_ahead": refresh_scheduler.stats()
+    }
 
-@app.get("/api/recommend")
+# Documents both body versions; the endpoint returns an ORJSONResponse, so neither is re-validated
+@app.get("/api/recommend", response_model=Union[RecommendationResponse, LegacyRecommendationResponse],
+         response_model_exclude_none=True)
 async def recommend(
     destination: str,
-    include_images: bool = Query(default=True, description="Include place images from Google Places API")
+    include_images: bool = Query(default=True, description="Include place images from Google Places API"),
+    legacy: bool = Query(default=False, description="Return the version 1 body with activities as a JSON string"),
+    count: int = Query(default=DEFAULT_ACTIVITY_COUNT, ge=1, le=MAX_ACTIVITY_COUNT, description=COUNT_DESCRIPTION),
+    fields: str = Query(default=",".join(ACTIVITY_FIELDS), pattern=FIELDS_PATTERN, description=FIELDS_DESCRIPTION)
 ):
-    # Get weather data
-    weather_data = get_weather(destination)
-    
-    # Get AI recommendations
-    recommendation = get_ai_recommendation(destination)
-    
-    print(f"\n=== RAW AI RESPONSE ===")
-    print(f"Length: {len(recommendation)} chars")
-    print(f"First 200 chars: {recommendation[:200]}")
-    print(f"Last 100 chars: {recommendation[-100:]}")
-    print(f"======================\n")
-    
-    # Clean the response (remove markdown code blocks if present)
-    cleaned_recommendation = clean_json_response(recommendation)
+    selected = _parse_fields(fields)
+    refresh_scheduler.record(destination, _prompt_options(count, selected, include_images), include_images)
+    key = f"{normalize_destination(destination)}|{include_images}|{count}|{','.join(selected)}"
+    body = await _recommend_flight.do(key, _recommend, destination, include_images, count, selected)
+    # The body is built from validated activities, so skip FastAPI's re-validation and encode once
+    return ORJSONResponse(_to_legacy_response(body) if legacy else body)
+
+def _parse_fields(fields: str) -> Tuple[str, ...]:
+    """Validated fields parameter -> requested ACTIVITY_FIELDS, in their canonical order"""
+    requested = set(fields.split(","))
+    return tuple(field for field in ACTIVITY_FIELDS if field in requested)
+
+def _prompt_options(count: int, fields: Tuple[str, ...], include_images: bool) -> PromptOptions:
+    """
+    What to ask Gemini for: only the requested activities and fields, and no
+    links when Places enrichment replaces them anyway (output tokens drive
+    Gemini latency and cost)
+    """
+    if include_images:
+        fields = tuple(field for field in fields if field != "link")
+    return PromptOptions(count, fields)
+
+def _shape_activity(activity: dict, destination: str, fields: Tuple[str, ...]) -> dict:
+    """Drop the fields the client didn't ask for, and link to a Maps search if there's no link"""
+    for field in ACTIVITY_FIELDS:
+        if field not in fields:
+            activity.pop(field, None)
+    if "link" in fields and not activity.get("link"):
+        activity["link"] = build_search_url(activity["activity"], destination)
+    return activity
+
+async def _recommend(destination: str, include_images: bool, count: int = DEFAULT_ACTIVITY_COUNT,
+                     fields: Tuple[str, ...] = ACTIVITY_FIELDS) -> dict:
+    curated = _curated_response(destination, include_images, count, fields)
+    if curated is not None:
+        return curated
+
+    # Fetch weather and AI recommendations concurrently on the event loop (upstream
+    # calls use the async clients, so a slow upstream doesn't hold a thread).
+    # The Gemini path needs weather too; aget_weather coalesces both into one API call.
+    weather_data, recommendation = await asyncio.gather(
+        aget_weather(destination),
+        aget_ai_recommendation(destination, options=_prompt_options(count, fields, include_images))
+    )
+    return await _build_recommendation_response(
+        destination, recommendation, weather_data, include_images, count, fields
+    )
+
+def _curated_response(destination: str, include_images: bool, count: int = DEFAULT_ACTIVITY_COUNT,
+                      fields: Tuple[str, ...] = ACTIVITY_FIELDS) -> Optional[dict]:
+    """
+    Response body of a curated destination from the materialized snapshot, or
+    None if it isn't in the snapshot. Makes no upstream calls: weather is
+    included if cached, otherwise it is fetched in the background for the
+    next request.
+    """
+    entry = get_curated_destination(destination)
+    if entry is None:
+        return None
+    activities = [_shape_activity(activity, destination, fields) for activity in entry["activities"][:count]]
+    if not include_images:
+        for activity in activities:
+            activity.pop("imgUrl", None)
+    body = {"version": RESPONSE_VERSION, "destination": destination, "activities": activities}
+    weather_data = get_cached_weather(destination)
+    if weather_data is None:
+        refresh_weather_in_background(destination)
+    else:
+        body["weather"] = weather_data
+    return body
+
+def _to_legacy_response(body: dict) -> dict:
+    """Convert a response body to the version 1 format, with activities as a JSON string"""
+    legacy = {
+        "destination": body["destination"],
+        "recommendation": body.get("raw_response") or json.dumps(body["activities"])
+    }
+    for key in ("weather", "error", "raw_response"):
+        if key in body:
+            legacy[key] = body[key]
+    return legacy
+
+async def _build_recommendation_response(
+    destination: str,
+    recommendation: str,
+    weather_data: dict,
+    include_images: bool,
+    count: int = DEFAULT_ACTIVITY_COUNT,
+    fields: Tuple[str, ...] = ACTIVITY_FIELDS
+) -> dict:
+    """
+    Parse the recommendation text, keep the first count activities, enrich
+    them with Places data and build the response body (see RecommendationResponse)
+    """
+    logger.debug(
+        "Raw AI response for %s (%d chars): %s ... %s",
+        destination, len(recommendation), recommendation[:200], recommendation[-100:]
+    )
     
-    # Parse the JSON response
-    try:
-        activities = json.loads(cleaned_recommendation)
-        
-        if not isinstance(activities, list):
-            print(f"ERROR - Expected list, got {type(activities)}")
-            return {
-                "destination": destination,
-                "recommendation": recommendation,
-                "error": "Invalid response format - expected array"
-            }
-        
-        print(f"SUCCESS - Parsed {len(activities)} activities")
-        
-        # Add images and update URLs if requested
-        if include_images:
-            activities = get_place_info_batch(activities, destination)
-            recommendation = json.dumps(activities)
-        else:
-            recommendation = json.dumps(activities)
-            
-    except json.JSONDecodeError as e:
-        print(f"ERROR - JSON Parse Error: {e}")
-        print(f"Attempted to parse: {cleaned_recommendation[:500]}")
-        return {
-            "destination": destination,
-            "recommendation": recommendation,
-            "error": f"Failed to parse JSON: {str(e)}",
-            "raw_response": recommendation[:1000]  # First 1000 chars for debugging
-        }
-    except Exception as e:
-        print(f"ERROR - Unexpected error: {type(e).__name__}: {e}")
-        import traceback
-        traceback.print_exc()
+    # Recover every valid activity - prose, code fences, trailing commas and a
+    # truncated last element don't fail the whole response
+    parsed = parse_activities(recommendation)
+    if not parsed.activities:
+        logger.error("No activities could be parsed for %s: %s", destination, recommendation[:500])
         return {
+            "version": RESPONSE_VERSION,
             "destination": destination,
-            "recommendation": recommendation,
+            "activities": [],
             "weather": weather_data,
-            "error": f"Unexpected error: {str(e)}"
+            "error": "Failed to parse JSON: no valid activities in the response",
+            "raw_response": recommendation[:1000]  # First 1000 chars for debugging
         }
-    
-    return {
+
+    # RAG and snapshot results have every activity - don't enrich the ones that aren't returned
+    activities = parsed.activities[:count]
+    logger.info("Parsed %d activities for %s", len(parsed.activities), destination)
+
+    body = {
+        "version": RESPONSE_VERSION,
         "destination": destination,
-        "recommendation": recommendation,
+        "activities": activities,
         "weather": weather_data
     }
+    # Add images and update URLs if requested
+    if include_images:
+        try:
+            with track_stage("places_batch"):
+                body["activities"] = await aget_place_info_batch(activities, destination)
+        except Exception as e:
+            logger.exception("Unexpected error: %s: %s", type(e).__name__, e)
+            body["error"] = f"Unexpected error: {str(e)}"
+    for activity in body["activities"]:
+        _shape_activity(activity, destination, fields)
+    return body
+
+def _format_event(event: dict, fmt: str) -> str:
+    """Serialize one stream event as an NDJSON line or an SSE message"""
+    data = orjson.dumps(event).decode()
+    if fmt == "sse":
+        return f"event: {event['type']}\ndata: {data}\n\n"
+    return data + "\n"
+
+def _stream_recommendation(destination: str, include_images: bool, fmt: str,
+                           count: int = DEFAULT_ACTIVITY_COUNT, fields: Tuple[str, ...] = ACTIVITY_FIELDS):
+    """
+    Yield weather, then each of the first count activities as soon as it is
+    parsed from the LLM stream (and enriched, if requested), then a final
+    'done' event
+    """
+    curated = _curated_response(destination, include_images, count, fields)
+    if curated is not None:
+        if "weather" in curated:
+            yield _format_event({"type": "weather", "data": curated["weather"]}, fmt)
+        for activity in curated["activities"]:
+            yield _format_event({"type": "activity", "data": activity}, fmt)
+        yield _format_event({
+            "type": "done", "destination": destination, "count": len(curated["activities"]), "dropped": 0
+        }, fmt)
+        return
+
+    weather_data = get_weather(destination)
+    yield _format_event({"type": "weather", "data": weather_data}, fmt)
+
+    parser = JsonArrayStreamParser(validate=validate_activity)
+    options = _prompt_options(count, fields, include_images)
+    pending = []
+    received = 0
+    sent = 0
+
+    try:
+        for chunk in stream_ai_recommendation(destination, weather_data, options):
+            for activity in parser.feed(chunk):
+                # RAG and cached responses can have more activities than requested
+                if received >= count:
+                    continue
+                received += 1
+                if include_images:
+                    pending.append(submit_enrich_activity(activity, destination))
+                else:
+                    sent += 1
+                    activity = _shape_activity(activity, destination, fields)
+                    yield _format_event({"type": "activity", "data": activity}, fmt)
+
+            # Emit enriched activities in order as their Places lookups finish
+            while pending and pending[0].done():
+                sent += 1
+                activity = _shape_activity(pending.pop(0).result(), destination, fields)
+                yield _format_event({"type": "activity", "data": activity}, fmt)
+
+        parser.close()
+        for future in pending:
+            sent += 1
+            activity = _shape_activity(future.result(), destination, fields)
+            yield _format_event({"type": "activity", "data": activity}, fmt)
+    except Exception as e:
+        logger.exception("Streaming error: %s: %s", type(e).__name__, e)
+        yield _format_event({"type": "error", "error": str(e)}, fmt)
+
+    done = {"type": "done", "destination": destination, "count": sent, "dropped": parser.dropped}
+    if sent == 0:
+        done["error"] = "No activities could be parsed from the response"
+    yield _format_event(done, fmt)
+
+@app.get("/api/recommend/stream")
+async def recommend_stream(
+    destination: str,
+    include_images: bool = Query(default=True, description="Include place images from Google Places API"),
+    format: str = Query(default="ndjson", pattern="^(ndjson|sse)$", description="Stream format: ndjson or sse"),
+    count: int = Query(default=DEFAULT_ACTIVITY_COUNT, ge=1, le=MAX_ACTIVITY_COUNT, description=COUNT_DESCRIPTION),
+    fields: str = Query(default=",".join(ACTIVITY_FIELDS), pattern=FIELDS_PATTERN, description=FIELDS_DESCRIPTION)
+):
+    """Stream recommendations as NDJSON lines or Server-Sent Events, one activity per event"""
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    selected = _parse_fields(fields)
+    refresh_scheduler.record(destination, _prompt_options(count, selected, include_images), include_images)
+    # The generator is synchronous, so Starlette iterates it in a worker thread
+    return StreamingResponse(
+        _stream_recommendation(destination, include_images, format, count, selected),
+        media_type=media_type,
+        headers=STREAM_HEADERS
+    )
+
+class BatchRecommendRequest(BaseModel):
+    destinations: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_DESTINATIONS)
+    include_images: bool = Field(default=True, description="Include place images from Google Places API")
+    legacy: bool = Field(default=False, description="Return version 1 bodies with activities as a JSON string")
+    count: int = Field(default=DEFAULT_ACTIVITY_COUNT, ge=1, le=MAX_ACTIVITY_COUNT, description=COUNT_DESCRIPTION)
+    fields: str = Field(default=",".join(ACTIVITY_FIELDS), pattern=FIELDS_PATTERN, description=FIELDS_DESCRIPTION)
+
+@app.post("/api/recommend/batch")
+async def recommend_batch(request: BatchRecommendRequest):
+    """
+    Get recommendations for many destinations, e.g. to prefetch popular itineraries
+    
+    Destinations are deduplicated, curated ones are answered from the
+    materialized snapshot, RAG lookups for all of them run in one batch, and weather/Gemini/Places work runs with at most
+    BATCH_MAX_CONCURRENCY destinations in flight. Results are streamed as
+    NDJSON, one line per destination in completion order, each with the same
+    shape as the /api/recommend response (RecommendationResponse).
+    """
+    unique = {}
+    for destination in request.destinations:
+        key = normalize_destination(destination)
+        if key and key not in unique:
+            unique[key] = destination.strip()
+    destinations = list(unique.values())
+    include_images = request.include_images
+    count = request.count
+    fields = _parse_fields(request.fields)
+    options = _prompt_options(count, fields, include_images)
+
+    async def process(destination: str, rag_result, semaphore: asyncio.Semaphore) -> dict:
+        async with semaphore:
+            try:
+                curated = _curated_response(destination, include_images, count, fields)
+                if curated is not None:
+                    return curated
+                weather_data = await aget_weather(destination)
+                if rag_result:
+                    recommendation = json.dumps(rag_result['activities'])
+                else:
+                    recommendation = await aget_ai_recommendation(destination, weather_data, False, options)
+                return await _build_recommendation_response(
+                    destination, recommendation, weather_data, include_images, count, fields
+                )
+            except Exception as e:
+                logger.exception("Batch item '%s' failed: %s: %s", destination, type(e).__name__, e)
+                return {
+                    "version": RESPONSE_VERSION,
+                    "destination": destination,
+                    "activities": [],
+                    "error": f"Unexpected error: {str(e)}"
+                }
+
+    async def generate():
+        # One embedding call and one vector query for every destination without an exact match
+        rag_results = await asyncio.to_thread(rag_service.search_destinations_batch, destinations)
+        semaphore = asyncio.Semaphore(max(1, BATCH_MAX_CONCURRENCY))
+        tasks = [
+            asyncio.create_task(process(destination, rag_results.get(destination), semaphore))
+            for destination in destinations
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                body = await next_done
+                yield orjson.dumps(_to_legacy_response(body) if request.legacy else body) + b"\n"
+        finally:
+            # Client went away - don't keep calling upstream APIs for nobody
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson", headers=STREAM_HEADERS)
 
 
 if __name__ == "__main__":
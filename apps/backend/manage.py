@@ -0,0 +1,51 @@
+# apps/backend/manage.py
+"""
+Management commands for the trAIvel backend
+
+Usage:
+    python manage.py ingest [--batch-size N]
+    python manage.py materialize [--output PATH]
+"""
+import argparse
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+from logging_config import configure_logging
+
+configure_logging()
+
+
+def ingest(args):
+    """Sync the RAG vector database with less_known_destinations_data.json"""
+    from rag_service import sync_rag_database
+    sync_rag_database(batch_size=args.batch_size)
+
+
+def materialize(args):
+    """Write the curated destinations, enriched with Google Places data, to the read-only snapshot"""
+    from snapshot_store import CURATED_SNAPSHOT_PATH, materialize_curated_snapshot
+    materialize_curated_snapshot(args.output or CURATED_SNAPSHOT_PATH)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="trAIvel backend management commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = subparsers.add_parser("ingest", help=ingest.__doc__)
+    ingest_parser.add_argument("--batch-size", type=int, default=None,
+                               help="Documents embedded per batch (default: RAG_EMBED_BATCH_SIZE)")
+    ingest_parser.set_defaults(func=ingest)
+
+    materialize_parser = subparsers.add_parser("materialize", help=materialize.__doc__)
+    materialize_parser.add_argument("--output", default=None,
+                                    help="Snapshot file (default: CURATED_SNAPSHOT_PATH)")
+    materialize_parser.set_defaults(func=materialize)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+# apps/backend/metrics.py
+"""
+Minimal Prometheus-style metrics: counters, gauges and histograms with labels,
+rendered in the Prometheus text exposition format by render_metrics()
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Latency buckets in seconds - from cache hits (ms) up to slow Gemini generations
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: List["_Metric"] = []
+_collectors: List[Callable[[], Iterable[Tuple[str, str, Dict[str, str], float]]]] = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in sorted(labels.items())) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self._labels(key))} {value}" for key, value in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> (bucket counts, sum, count)
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(entry[0]), entry[1], entry[2]) for key, entry in self._values.items()]
+        lines = []
+        for key, bucket_counts, total, count in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': repr(bound)})} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+def register_collector(collector: Callable[[], Iterable[Tuple[str, str, Dict[str, str], float]]]):
+    """
+    Register a callback evaluated on every scrape. It returns
+    (name, kind, labels, value) samples, e.g. counters kept by a cache.
+    """
+    with _registry_lock:
+        _collectors.append(collector)
+
+
+def render_metrics() -> str:
+    """Render all metrics in the Prometheus text exposition format"""
+    lines = []
+    with _registry_lock:
+        metrics = list(_registry)
+        collectors = list(_collectors)
+
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+
+    # Samples of one metric must be contiguous, so group collector output by name
+    grouped: Dict[str, Tuple[str, List[str]]] = {}
+    for collector in collectors:
+        for name, kind, labels, value in collector():
+            grouped.setdefault(name, (kind, []))[1].append(f"{name}{_format_labels(labels)} {value}")
+    for name, (kind, samples) in grouped.items():
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples)
+
+    return "\n".join(lines) + "\n"
+
+
+# --- Backend metrics -------------------------------------------------------
+
+STAGE_DURATION = Histogram(
+    "traivel_stage_duration_seconds",
+    "Duration of each backend stage (weather, RAG, embedding, Gemini, Places calls)",
+    ("stage",)
+)
+UPSTREAM_REQUESTS = Counter(
+    "traivel_upstream_requests_total",
+    "Requests to upstream APIs by upstream and result status",
+    ("upstream", "status")
+)
+HTTP_REQUESTS = Counter(
+    "traivel_http_requests_total",
+    "HTTP requests served by route and status code",
+    ("method", "route", "status")
+)
+LLM_ACTIVITIES = Counter(
+    "traivel_llm_activities_total",
+    "Activities parsed from Gemini responses by result (ok, repaired, dropped)",
+    ("result",)
+)
+LLM_TOKENS = Counter(
+    "traivel_llm_tokens_total",
+    "Gemini tokens by type (input, output)",
+    ("type",)
+)
+LLM_OUTPUT_TOKENS = Histogram(
+    "traivel_llm_output_tokens",
+    "Output tokens per Gemini call",
+    buckets=(50, 100, 200, 400, 800, 1200, 1600, 2400, 3200)
+)
+REFRESH_AHEAD = Counter(
+    "traivel_refresh_ahead_total",
+    "Refresh-ahead work by kind (weather, recommendation, places) and result (ok, skipped_budget, skipped_headroom, error)",
+    ("kind", "result")
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "traivel_http_request_duration_seconds",
+    "HTTP request duration by route",
+    ("method", "route")
+)
+
+
+# Stage durations of the current request (stage -> seconds of each call), set
+# by start_request_timing() when profiling is enabled. Tasks and to_thread
+# calls inherit the context, so concurrent stages land in the same dict.
+_request_stages: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar("request_stages", default=None)
+
+
+def start_request_timing() -> Dict[str, List[float]]:
+    """Collect the stage timings of the current request (and the work it starts) into a new dict"""
+    stages: Dict[str, List[float]] = {}
+    _request_stages.set(stages)
+    return stages
+
+
+@contextmanager
+def track_stage(stage: str):
+    """Context manager timing one backend stage into traivel_stage_duration_seconds"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_DURATION.observe(duration, stage=stage)
+        stages = _request_stages.get()
+        if stages is not None:
+            stages.setdefault(stage, []).append(duration)
+
+
+def record_upstream(upstream: str, status) -> None:
+    """Count an upstream API call by its result status (HTTP code, API status or 'error')"""
+    UPSTREAM_REQUESTS.inc(upstream=upstream, status=str(status))
+
+
+def record_llm_parse(parsed) -> None:
+    """Count the activities recovered, repaired and dropped when parsing a Gemini response"""
+    LLM_ACTIVITIES.inc(len(parsed.activities) - parsed.repaired, result="ok")
+    if parsed.repaired:
+        LLM_ACTIVITIES.inc(parsed.repaired, result="repaired")
+    if parsed.dropped:
+        LLM_ACTIVITIES.inc(parsed.dropped, result="dropped")
+
+
+def record_llm_usage(input_tokens: int, output_tokens: int) -> None:
+    """Count the tokens of one Gemini call"""
+    LLM_TOKENS.inc(input_tokens, type="input")
+    LLM_TOKENS.inc(output_tokens, type="output")
+    LLM_OUTPUT_TOKENS.observe(output_tokens)
+
+
+def record_refresh_ahead(kind: str, result: str, amount: int = 1) -> None:
+    """Count refresh-ahead attempts by kind and result"""
+    REFRESH_AHEAD.inc(amount, kind=kind, result=result)
+
+
+def cache_stats_collector(name: str, stats_fn: Callable[[], dict]):
+    """Build a collector exposing hit/miss counters of a cache stats() dict"""
+    def collect():
+        stats = stats_fn()
+        # Tiered caches report one stats dict per tier
+        tiers = stats.items() if "hits" not in stats else [(None, stats)]
+        for tier, tier_stats in tiers:
+            if not tier_stats:
+                continue
+            labels = {"cache": name} if tier is None else {"cache": name, "tier": tier}
+            yield "traivel_cache_hits_total", "counter", labels, tier_stats["hits"] + tier_stats.get("semantic_hits", 0)
+            yield "traivel_cache_misses_total", "counter", labels, tier_stats["misses"]
+            if tier_stats["size"] is not None:
+                yield "traivel_cache_size", "gauge", labels, tier_stats["size"]
+    return collect
@@ -0,0 +1,13 @@
+# apps/backend/normalization.py
+import unicodedata
+
+
+def normalize_destination(name: str) -> str:
+    """Normalize a destination name for cache keys and lookups ("  Paris. " -> "paris")"""
+    return " ".join(name.lower().split()).strip(" .,;:!?")
+
+
+def fold_accents(text: str) -> str:
+    """Strip diacritics ("Nitrianske Právno" -> "Nitrianske Pravno")"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
@@ -1,24 +1,175 @@
 # apps/backend/places_service.py
+import logging
 import os
+import threading
+import time
+import asyncio
 import googlemaps
-from typing import Optional
+import httpx
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Optional
+from urllib.parse import quote_plus
+from cache import create_cache
+from http_clients import get_client
+from metrics import record_upstream, track_stage
+from resilience import RetryableError, UpstreamUnavailable, get_upstream
+
+logger = logging.getLogger(__name__)
 
 # Get API key from environment variable
 GOOGLE_PLACES_API_KEY = os.environ.get("GOOGLE_PLACES_API_KEY")
 
 if GOOGLE_PLACES_API_KEY:
     GOOGLE_PLACES_API_KEY = GOOGLE_PLACES_API_KEY.strip('"').strip("'")
-    print(f"INFO - Google Places API key loaded (length: {len(GOOGLE_PLACES_API_KEY)})")
+    logger.info("Google Places API key loaded (length: %d)", len(GOOGLE_PLACES_API_KEY))
 else:
-    print("WARNING - GOOGLE_PLACES_API_KEY not set. Using placeholder images.")
+    logger.warning("GOOGLE_PLACES_API_KEY not set. Using placeholder images.")
+
+# Google Maps client, created on first use (or by warm_up)
+_gmaps = None
+_gmaps_lock = threading.Lock()
+
+def get_gmaps_client() -> Optional[googlemaps.Client]:
+    """Return the Google Maps client, or None if no API key is configured"""
+    global _gmaps
+    if _gmaps is None and GOOGLE_PLACES_API_KEY:
+        with _gmaps_lock:
+            if _gmaps is None:
+                # Retries are done by _places_upstream, which also rate limits them;
+                # the client's own retry loop would keep retrying quota errors for a minute
+                _gmaps = googlemaps.Client(
+                    key=GOOGLE_PLACES_API_KEY, retry_over_query_limit=False, retry_timeout=0
+                )
+    return _gmaps
+
+# Maximum number of Places lookups running at the same time (per worker)
+PLACES_MAX_CONCURRENCY = int(os.environ.get("PLACES_MAX_CONCURRENCY", "5"))
+
+# Shared pool so concurrent requests don't multiply the number of in-flight Google calls
+# (async lookups are capped by the connection limit of their HTTP client instead)
+_places_executor = ThreadPoolExecutor(
+    max_workers=max(1, PLACES_MAX_CONCURRENCY),
+    thread_name_prefix="places"
+)
+
+# "single": one Find Place request per activity (photo + place ID, linking to Google Maps).
+# "details": Text Search followed by Place Details (official website, two requests).
+PLACES_ENRICHMENT_MODE = os.environ.get("PLACES_ENRICHMENT_MODE", "single").lower()
+# In "single" mode, also fetch the official website with a website-only Details request
+PLACES_WEBSITE_LOOKUP = os.environ.get("PLACES_WEBSITE_LOOKUP", "false").lower() in ("1", "true", "yes")
+# Time budget for enriching one recommendation, in milliseconds (0 = no limit)
+PLACES_BUDGET_MS = int(os.environ.get("PLACES_BUDGET_MS", "0"))
+
+# Cache settings - found places rarely change, "not found" is kept for a shorter time
+PLACES_CACHE_TTL = int(os.environ.get("PLACES_CACHE_TTL", str(7 * 24 * 3600)))
+PLACES_CACHE_NEGATIVE_TTL = int(os.environ.get("PLACES_CACHE_NEGATIVE_TTL", "3600"))
+PLACES_CACHE_SIZE = int(os.environ.get("PLACES_CACHE_SIZE", "5000"))
+PLACES_CACHE_PATH = os.environ.get("PLACES_CACHE_PATH")  # Optional SQLite file, e.g. ./cache/places.db
+
+# Places web service used by the async lookups, and their timeouts (seconds)
+PLACES_API_URL = "https://maps.googleapis.com/maps/api/place"
+PLACES_TIMEOUT = httpx.Timeout(
+    float(os.environ.get("PLACES_READ_TIMEOUT", "5")),
+    connect=float(os.environ.get("PLACES_CONNECT_TIMEOUT", "3"))
+)
+
+# Shared by the workers when CACHE_BACKEND is sqlite or redis; PLACES_CACHE_PATH adds
+# a private SQLite tier with the default memory backend
+_places_cache = create_cache("places", maxsize=PLACES_CACHE_SIZE, ttl=PLACES_CACHE_TTL, path=PLACES_CACHE_PATH)
+
+def _is_retryable(error: Exception) -> bool:
+    """Quota errors, transient server errors and network failures are worth retrying"""
+    if isinstance(error, googlemaps.exceptions.ApiError):
+        return error.status in ('OVER_QUERY_LIMIT', 'UNKNOWN_ERROR')
+    if isinstance(error, googlemaps.exceptions.HTTPError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, (
+        RetryableError, httpx.TransportError, googlemaps.exceptions.Timeout, googlemaps.exceptions.TransportError
+    ))
 
-# Initialize Google Maps client
-gmaps = googlemaps.Client(key=GOOGLE_PLACES_API_KEY) if GOOGLE_PLACES_API_KEY else None
+# Rate limit (per worker), retries and circuit breaker for all Places requests
+_places_upstream = get_upstream(
+    "google_places", "PLACES", _is_retryable, default_rate=50, default_burst=50
+)
+
+def _cache_key(query: str, destination: str) -> str:
+    """Normalize (activity, destination) so trivial differences share a cache entry"""
+    return f"{' '.join(query.lower().split())}|{' '.join(destination.lower().split())}"
+
+def _build_photo_url(photo_reference: str) -> str:
+    return f"https://maps.googleapis.com/maps/api/place/photo?maxwidth=400&photo_reference={photo_reference}&key={GOOGLE_PLACES_API_KEY}"
+
+def _build_maps_url(place_id: str) -> str:
+    return f"https://www.google.com/maps/place/?q=place_id:{place_id}"
+
+def build_search_url(query: str, destination: str = "") -> str:
+    """Google Maps search link for an activity Places couldn't resolve"""
+    search_query = f"{query}, {destination}" if destination else query
+    return f"https://www.google.com/maps/search/?api=1&query={quote_plus(search_query)}"
+
+def _call_places(stage: str, method, **kwargs) -> dict:
+    """
+    Call a googlemaps client method through the rate limiter and circuit
+    breaker, recording the latency and result status of every attempt
+    """
+    return _places_upstream.call(_call_places_once, stage, method, **kwargs)
+
+def _call_places_once(stage: str, method, **kwargs) -> dict:
+    try:
+        with track_stage(stage):
+            response = method(**kwargs)
+    except googlemaps.exceptions.ApiError as e:
+        record_upstream("google_places", e.status)
+        raise
+    except Exception:
+        record_upstream("google_places", "error")
+        raise
+    record_upstream("google_places", response.get('status'))
+    return response
+
+async def _acall_places(stage: str, endpoint: str, **params) -> dict:
+    """Async Places web service request through the rate limiter and circuit breaker"""
+    return await _places_upstream.acall(_acall_places_once, stage, endpoint, params)
+
+async def _acall_places_once(stage: str, endpoint: str, params: dict) -> dict:
+    client = get_client("google_places", PLACES_TIMEOUT, max_connections=max(1, PLACES_MAX_CONCURRENCY))
+    try:
+        with track_stage(stage):
+            response = await client.get(
+                f"{PLACES_API_URL}/{endpoint}/json", params={**params, "key": GOOGLE_PLACES_API_KEY}
+            )
+    except Exception:
+        record_upstream("google_places", "error")
+        raise
+    if response.status_code == 429 or response.status_code >= 500:
+        record_upstream("google_places", response.status_code)
+        raise RetryableError(f"Places returned HTTP {response.status_code}")
+    body = response.json()
+    status = body.get('status')
+    record_upstream("google_places", status)
+    # Same retry policy as the googlemaps ApiError statuses in _is_retryable
+    if status in ('OVER_QUERY_LIMIT', 'UNKNOWN_ERROR'):
+        raise RetryableError(f"Places returned {status}")
+    return body
+
+def _place_ttl(result: Optional[dict]) -> Optional[int]:
+    # Transient failures (None) aren't cached, so the next request retries
+    return None if result is None else (PLACES_CACHE_TTL if result else PLACES_CACHE_NEGATIVE_TTL)
+
+def get_places_cache_stats() -> dict:
+    """Return hit/miss counters of the Places cache"""
+    return _places_cache.stats()
 
 def get_place_info(query: str, destination: str = "") -> dict:
     """
     Get photo URL and website for a place using Google Places API
     
+    Uses one Find Place request per activity by default, or Text Search plus
+    Place Details with PLACES_ENRICHMENT_MODE=details.
+    
+    Results are cached per (activity, destination). Photo references are cached
+    instead of photo URLs so the API key is never written to a shared cache.
+    
     Args:
         query: The search query (e.g., "Eiffel Tower" or "Louvre Museum")
         destination: Optional destination to add context (e.g., "Paris")
@@ -26,129 +177,437 @@ def get_place_info(query: str, destination: str = "") -> dict:
     Returns:
         Dict with 'photo_url' and 'website' or empty dict if not found
     """
-    if not gmaps:
-        print("WARNING - Google Maps client not initialized. Check GOOGLE_PLACES_API_KEY!")
+    if not get_gmaps_client():
+        logger.warning("Google Maps client not initialized. Check GOOGLE_PLACES_API_KEY!")
+        return {}
+    
+    key = _cache_key(query, destination)
+    cached = _places_cache.get_or_set(
+        key,
+        lambda: _lookup_place(query, destination),
+        ttl=_place_ttl
+    )
+    if cached is None:
         return {}
     
-    print(f"\n=== FETCHING INFO FOR: {query} ===")
+    # Single mode only knows the Google Maps URL - look up the website once if configured
+    if _needs_website(cached):
+        website = _fetch_website(cached['place_id'])
+        if website is not None:
+            cached = {**cached, 'website': website}
+            _places_cache.set(key, cached, PLACES_CACHE_TTL)
+    
+    return _to_place_info(cached)
+
+def _lookup_place(query: str, destination: str) -> Optional[dict]:
+    if PLACES_ENRICHMENT_MODE == "details":
+        return _fetch_place_info(query, destination)
+    return _find_place_info(query, destination)
+
+def _needs_website(cached: dict) -> bool:
+    return PLACES_WEBSITE_LOOKUP and bool(cached.get('place_id')) and 'website' not in cached
+
+def _to_place_info(cached: dict) -> dict:
+    """Build 'photo_url' and 'website' from a cache entry"""
+    place_info = {}
+    if cached.get('photo_reference'):
+        place_info['photo_url'] = _build_photo_url(cached['photo_reference'])
+    website = cached.get('website') or (_build_maps_url(cached['place_id']) if cached.get('place_id') else None)
+    if website:
+        place_info['website'] = website
+    return place_info
+
+def _find_place_info(query: str, destination: str) -> Optional[dict]:
+    """
+    Look up a place with a single field-masked Find Place request
+    
+    Returns:
+        Dict with 'place_id' and 'photo_reference', empty dict if the place
+        doesn't exist, or None on errors that shouldn't be cached
+    """
+    gmaps = get_gmaps_client()
+    search_query = f"{query}, {destination}" if destination else query
+    
+    try:
+        response = _call_places(
+            "places_find_place", gmaps.find_place,
+            input=search_query,
+            input_type='textquery',
+            fields=['place_id', 'name', 'photos']
+        )
+        return _parse_find_place(response, search_query)
+    except UpstreamUnavailable as e:
+        logger.debug("Skipping Find Place for '%s': %s", search_query, e)
+        return None
+    except Exception as e:
+        logger.error("Find Place failed for '%s': %s: %s", search_query, type(e).__name__, e)
+        return None
+
+def _parse_find_place(response: dict, search_query: str) -> Optional[dict]:
+    """Cache entry from a Find Place response (see _find_place_info)"""
+    status = response.get('status')
+    
+    if status == 'ZERO_RESULTS' or (status == 'OK' and not response.get('candidates')):
+        logger.debug("No place found for '%s'", search_query)
+        return {}
+    
+    if status != 'OK':
+        logger.error("Find Place returned status '%s' for '%s'", status, search_query)
+        return None
+    
+    candidate = response['candidates'][0]
+    if not candidate.get('place_id'):
+        return {}
+    
+    place_info = {'place_id': candidate['place_id']}
+    photos = candidate.get('photos', [])
+    if photos and photos[0].get('photo_reference'):
+        place_info['photo_reference'] = photos[0]['photo_reference']
+    return place_info
+
+def _fetch_website(place_id: str) -> Optional[str]:
+    """
+    Fetch only the website of a place with Place Details
+    
+    Returns:
+        The website, '' if the place has none, or None on errors
+    """
+    try:
+        details = _call_places("places_website", get_gmaps_client().place, place_id=place_id, fields=['website'])
+        return _parse_website(details)
+    except UpstreamUnavailable as e:
+        logger.debug("Skipping website lookup: %s", e)
+        return None
+    except Exception as e:
+        logger.error("Website lookup failed: %s: %s", type(e).__name__, e)
+        return None
+
+def _parse_website(details: dict) -> Optional[str]:
+    if details.get('status') != 'OK':
+        logger.error("Details API returned '%s' for website lookup", details.get('status'))
+        return None
+    return details.get('result', {}).get('website', '')
+
+def _fetch_place_info(query: str, destination: str) -> Optional[dict]:
+    """
+    Look up a place with Text Search + Place Details
+    
+    Returns:
+        Dict with 'photo_reference' and 'website', empty dict if the place
+        doesn't exist, or None on errors that shouldn't be cached
+    """
+    gmaps = get_gmaps_client()
+    
+    # Combine query with destination for better results
+    search_query = f"{query}, {destination}" if destination else query
     
     try:
-        # Combine query with destination for better results
-        search_query = f"{query}, {destination}" if destination else query
-        
-        print(f"1. Searching Places API: '{search_query}'")
-        
         # Search for the place
-        places_result = gmaps.places(query=search_query)
-        
-        status = places_result.get('status')
-        print(f"2. API Status: {status}")
-        
-        if status != 'OK':
-            print(f"   ERROR: API returned status '{status}'")
-            if status == 'REQUEST_DENIED':
-                print("   → Check if Places API is enabled in Google Cloud Console")
-                print("   → Verify API key has Places API permissions")
-            return {}
-        
-        if not places_result.get('results'):
-            print(f"3. No results found")
-            return {}
-        
-        # Get the first result
-        place = places_result['results'][0]
-        place_id = place.get('place_id')
-        place_name = place.get('name', 'Unknown')
-        
-        print(f"3. Found: '{place_name}' (ID: {place_id[:20]}...)")
-        
+        places_result = _call_places("places_text_search", gmaps.places, query=search_query)
+        place_id = _parse_text_search(places_result, search_query)
         if not place_id:
-            return {}
+            return None if place_id is None else {}
         
         # Get place details including photos and website
-        print(f"4. Fetching place details...")
-        place_details = gmaps.place(place_id=place_id, fields=['name', 'photo', 'website', 'url'])
-        
-        detail_status = place_details.get('status')
-        print(f"5. Details Status: {detail_status}")
-        
-        if detail_status != 'OK':
-            print(f"   ERROR: Details API returned '{detail_status}'")
-            return {}
-        
-        result = place_details.get('result', {})
-        
-        # Debug: Show all available keys
-        print(f"6. Available fields in result: {list(result.keys())}")
-        
-        photos = result.get('photos', [])
-        website = result.get('website')
-        url = result.get('url')
-        
-        print(f"7. website field: {website}")
-        print(f"8. url field: {url}")
-        
-        place_info = {}
-        
-        # Get photo URL
-        if photos:
-            print(f"9. Found {len(photos)} photo(s)")
-            photo_reference = photos[0].get('photo_reference')
-            
-            if photo_reference:
-                photo_url = f"https://maps.googleapis.com/maps/api/place/photo?maxwidth=400&photo_reference={photo_reference}&key={GOOGLE_PLACES_API_KEY}"
-                place_info['photo_url'] = photo_url
-                print(f"10. ✓ Photo URL generated")
-        else:
-            print(f"9. No photos available")
-        
-        # Get website URL - prefer official website, fallback to Google Maps URL
-        final_url = website or url
-        if final_url:
-            place_info['website'] = final_url
-            print(f"11. ✓ Using URL: {final_url[:60]}...")
-        else:
-            print(f"11. No website/URL available")
-        
-        print(f"=== END ===\n")
-        return place_info
+        place_details = _call_places(
+            "places_details", gmaps.place,
+            place_id=place_id, fields=['name', 'photo', 'website', 'url']
+        )
+        return _parse_place_details(place_details, search_query)
         
+    except UpstreamUnavailable as e:
+        logger.debug("Skipping Places lookup for '%s': %s", search_query, e)
+        return None
     except Exception as e:
-        print(f"ERROR - Exception: {type(e).__name__}: {e}")
-        import traceback
-        traceback.print_exc()
-        print(f"=== END (ERROR) ===\n")
+        logger.exception("Places lookup failed for '%s': %s: %s", search_query, type(e).__name__, e)
+        return None
+
+def _parse_text_search(places_result: dict, search_query: str) -> Optional[str]:
+    """Place ID of the first Text Search result, '' if nothing was found, or None on errors"""
+    status = places_result.get('status')
+    
+    if status == 'ZERO_RESULTS' or (status == 'OK' and not places_result.get('results')):
+        logger.debug("No place found for '%s'", search_query)
+        return ''
+    
+    if status != 'OK':
+        logger.error("Text Search returned status '%s' for '%s'", status, search_query)
+        if status == 'REQUEST_DENIED':
+            logger.error("Check that the Places API is enabled and the API key has Places API permissions")
+        return None
+    
+    # Get the first result
+    place = places_result['results'][0]
+    logger.debug("Found '%s' for '%s'", place.get('name', 'Unknown'), search_query)
+    return place.get('place_id') or ''
+
+def _parse_place_details(place_details: dict, search_query: str) -> Optional[dict]:
+    """Cache entry from a Place Details response (see _fetch_place_info)"""
+    detail_status = place_details.get('status')
+    
+    if detail_status == 'NOT_FOUND':
         return {}
+    
+    if detail_status != 'OK':
+        logger.error("Details API returned '%s' for '%s'", detail_status, search_query)
+        return None
+    
+    result = place_details.get('result', {})
+    photos = result.get('photos', [])
+    
+    place_info = {}
+    
+    # Get photo reference (the URL is built on read, see _build_photo_url)
+    if photos and photos[0].get('photo_reference'):
+        place_info['photo_reference'] = photos[0]['photo_reference']
+    
+    # Get website URL - prefer official website, fallback to Google Maps URL
+    final_url = result.get('website') or result.get('url')
+    if final_url:
+        place_info['website'] = final_url
+    
+    logger.debug(
+        "Place info for '%s': photo=%s website=%s",
+        search_query, 'photo_reference' in place_info, final_url
+    )
+    return place_info
+
+async def _alookup_place(query: str, destination: str) -> Optional[dict]:
+    """Async variant of _lookup_place through the pooled HTTP client"""
+    search_query = f"{query}, {destination}" if destination else query
+    try:
+        if PLACES_ENRICHMENT_MODE != "details":
+            response = await _acall_places(
+                "places_find_place", "findplacefromtext",
+                input=search_query, inputtype="textquery", fields="place_id,name,photos"
+            )
+            return _parse_find_place(response, search_query)
+        
+        places_result = await _acall_places("places_text_search", "textsearch", query=search_query)
+        place_id = _parse_text_search(places_result, search_query)
+        if not place_id:
+            return None if place_id is None else {}
+        place_details = await _acall_places(
+            "places_details", "details", place_id=place_id, fields="name,photo,website,url"
+        )
+        return _parse_place_details(place_details, search_query)
+    except UpstreamUnavailable as e:
+        logger.debug("Skipping Places lookup for '%s': %s", search_query, e)
+        return None
+    except Exception as e:
+        logger.error("Places lookup failed for '%s': %s: %s", search_query, type(e).__name__, e)
+        return None
+
+async def _afetch_website(place_id: str) -> Optional[str]:
+    try:
+        details = await _acall_places("places_website", "details", place_id=place_id, fields="website")
+        return _parse_website(details)
+    except UpstreamUnavailable as e:
+        logger.debug("Skipping website lookup: %s", e)
+        return None
+    except Exception as e:
+        logger.error("Website lookup failed: %s: %s", type(e).__name__, e)
+        return None
 
 
-def get_place_info_batch(activities: list, destination: str) -> list:
+# Default fallback image - a nice travel-themed placeholder
+DEFAULT_IMAGE = "https://images.unsplash.com/photo-1488646953014-85cb44e25828?w=400&h=300&fit=crop"
+
+def _apply_place_info(activity: dict, place_info: dict) -> dict:
+    """Set 'imgUrl' and 'link' of an activity from get_place_info results"""
+    # Update photo URL
+    if place_info.get('photo_url'):
+        activity['imgUrl'] = place_info['photo_url']
+    else:
+        # Use Unsplash as fallback
+        activity['imgUrl'] = DEFAULT_IMAGE
+    
+    # Update website URL (prefer Google Places URL over Gemini's)
+    if place_info.get('website'):
+        activity['link'] = place_info['website']
+        logger.debug("Updated link for '%s': %s", activity.get('activity', ''), place_info['website'])
+    
+    return activity
+
+def enrich_activity(activity: dict, destination: str) -> dict:
+    """
+    Set 'imgUrl' and 'link' of a single activity from Google Places
+    
+    Args:
+        activity: Activity dict with 'activity' field (updated in place)
+        destination: The destination city/location
+    
+    Returns:
+        The updated activity
+    """
+    return _apply_place_info(activity, get_place_info(activity.get('activity', ''), destination))
+
+def submit_enrich_activity(activity: dict, destination: str) -> Future:
+    """Schedule enrich_activity on the shared Places pool and return its Future"""
+    return _places_executor.submit(enrich_activity, activity, destination)
+
+def get_place_info_batch(activities: list, destination: str, budget_ms: Optional[int] = None) -> list:
     """
     Get photos and websites for multiple activities
     
+    Cached activities are resolved with one bulk cache read. The remaining
+    lookups run concurrently on a shared thread pool limited to
+    PLACES_MAX_CONCURRENCY in-flight requests. Activities whose lookup hasn't
+    finished within the budget get DEFAULT_IMAGE; lookups already running keep
+    going in the background and fill the cache for the next request.
+    
     Args:
         activities: List of activity dicts with 'activity' field
         destination: The destination city/location
+        budget_ms: Time budget in milliseconds (defaults to PLACES_BUDGET_MS, 0 = no limit)
     
     Returns:
         List of activities with 'imgUrl' and 'link' fields updated
     """
-    # Default fallback image - a nice travel-themed placeholder
-    DEFAULT_IMAGE = "https://images.unsplash.com/photo-1488646953014-85cb44e25828?w=400&h=300&fit=crop"
+    budget_ms = PLACES_BUDGET_MS if budget_ms is None else budget_ms
+    start = time.monotonic()
     
-    for activity in activities:
-        activity_name = activity.get('activity', '')
-        place_info = get_place_info(activity_name, destination)
-        
-        # Update photo URL
-        if place_info.get('photo_url'):
-            activity['imgUrl'] = place_info['photo_url']
+    keys = [_cache_key(activity.get('activity', ''), destination) for activity in activities]
+    cached = _places_cache.get_many(keys) if get_gmaps_client() else {}
+    
+    futures = {}
+    for index, (activity, key) in enumerate(zip(activities, keys)):
+        entry = cached.get(key)
+        if entry is not None and not _needs_website(entry):
+            _apply_place_info(activity, _to_place_info(entry))
         else:
-            # Use Unsplash as fallback
-            activity['imgUrl'] = DEFAULT_IMAGE
-        
-        # Update website URL (prefer Google Places URL over Gemini's)
-        if place_info.get('website'):
-            activity['link'] = place_info['website']
-            print(f"   → Updated link for '{activity_name}': {place_info['website'][:50]}...")
+            futures[index] = _places_executor.submit(get_place_info, activity.get('activity', ''), destination)
+    if futures:
+        wait(futures.values(), timeout=budget_ms / 1000 if budget_ms > 0 else None)
+    
+    skipped = 0
+    for index, future in futures.items():
+        if future.done():
+            _apply_place_info(activities[index], future.result())
+        else:
+            future.cancel()
+            activities[index]['imgUrl'] = DEFAULT_IMAGE
+            skipped += 1
+    
+    if skipped:
+        elapsed_ms = (time.monotonic() - start) * 1000
+        logger.warning(
+            "Places budget of %dms exceeded after %.0fms, %d activities use the default image",
+            budget_ms, elapsed_ms, skipped
+        )
+    
+    return activities
+
+def refresh_places_ahead(activities: list, destination: str, lead_time: float,
+                         allow: Callable[[], bool]) -> int:
+    """
+    Look up again the activities whose cached place is missing or expires
+    within lead_time seconds, while allow() returns True
+
+    Returns the number of lookups made.
+    """
+    if not get_gmaps_client():
+        return 0
+    queries = {_cache_key(activity.get('activity', ''), destination): activity.get('activity', '')
+               for activity in activities}
+    cached = _places_cache.get_many_entries(queries)
+
+    refreshed = 0
+    for key, query in queries.items():
+        entry = cached.get(key)
+        if entry is not None and entry[1] > lead_time:
+            continue
+        if not allow():
+            break
+        _places_cache.refresh(key, lambda query=query: _lookup_place(query, destination), ttl=_place_ttl)
+        refreshed += 1
+    return refreshed
+
+async def aget_place_info(query: str, destination: str = "") -> dict:
+    """Async variant of get_place_info - requests go through the pooled HTTP client"""
+    if not GOOGLE_PLACES_API_KEY:
+        logger.warning("GOOGLE_PLACES_API_KEY is not set, no Places lookup")
+        return {}
+    
+    key = _cache_key(query, destination)
+    cached = await _places_cache.aget_or_set(
+        key,
+        lambda: _alookup_place(query, destination),
+        ttl=_place_ttl
+    )
+    if cached is None:
+        return {}
+    
+    if _needs_website(cached):
+        website = await _afetch_website(cached['place_id'])
+        if website is not None:
+            cached = {**cached, 'website': website}
+            _places_cache.set(key, cached, PLACES_CACHE_TTL)
+    
+    return _to_place_info(cached)
+
+# Async lookups that outlived their request's budget - the event loop only
+# keeps weak references to tasks, so they are held here until they finish
+_background_lookups = set()
+
+async def aget_place_info_batch(activities: list, destination: str, budget_ms: Optional[int] = None) -> list:
+    """
+    Async variant of get_place_info_batch
+    
+    Uncached activities are looked up concurrently on the event loop, at
+    most PLACES_MAX_CONCURRENCY requests at a time (the connection limit of
+    the Places HTTP client). Lookups still running when the budget runs out
+    continue in the background and fill the cache.
+    """
+    budget_ms = PLACES_BUDGET_MS if budget_ms is None else budget_ms
+    start = time.monotonic()
+    
+    keys = [_cache_key(activity.get('activity', ''), destination) for activity in activities]
+    cached = _places_cache.get_many(keys) if GOOGLE_PLACES_API_KEY else {}
+    
+    tasks = {}
+    for index, (activity, key) in enumerate(zip(activities, keys)):
+        entry = cached.get(key)
+        if entry is not None and not _needs_website(entry):
+            _apply_place_info(activity, _to_place_info(entry))
+        else:
+            tasks[index] = asyncio.ensure_future(aget_place_info(activity.get('activity', ''), destination))
+    if tasks:
+        # wait() doesn't cancel the tasks that are still running at the timeout
+        await asyncio.wait(tasks.values(), timeout=budget_ms / 1000 if budget_ms > 0 else None)
+    
+    skipped = 0
+    failed = 0
+    for index, task in tasks.items():
+        if not task.done():
+            # Keep a reference so the lookup finishes in the background
+            _background_lookups.add(task)
+            task.add_done_callback(_finish_background_lookup)
+            skipped += 1
+        elif task.cancelled() or task.exception() is not None:
+            if not task.cancelled():
+                logger.warning("Places lookup for %r failed: %s", activities[index].get('activity', ''),
+                               task.exception())
+            failed += 1
+        else:
+            _apply_place_info(activities[index], task.result())
+            continue
+        activities[index]['imgUrl'] = DEFAULT_IMAGE
+    
+    if skipped:
+        elapsed_ms = (time.monotonic() - start) * 1000
+        logger.warning(
+            "Places budget of %dms exceeded after %.0fms, %d activities use the default image",
+            budget_ms, elapsed_ms, skipped
+        )
+    if failed:
+        logger.warning("%d Places lookups for %s failed, their activities use the default image",
+                       failed, destination)
     
     return activities
+
+def _finish_background_lookup(task: asyncio.Task):
+    _background_lookups.discard(task)
+    # Retrieve the exception so it isn't reported as never retrieved
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Background Places lookup failed: %s", task.exception())
@@ -0,0 +1,111 @@
+# apps/backend/profiling.py
+"""
+Opt-in latency diagnostics (PROFILING_ENABLED=true)
+
+- Stage timings recorded by metrics.track_stage during a request are returned
+  in a Server-Timing header, so browser dev tools and curl show where the
+  time went.
+- Requests slower than SLOW_REQUEST_THRESHOLD_MS are logged with their stage
+  breakdown.
+- sample_stacks() is a sampling profiler for the whole worker: it snapshots
+  the Python stack of every thread every few milliseconds and returns the
+  samples in the collapsed-stack format read by flamegraph.pl, speedscope and
+  inferno.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+SLOW_REQUEST_THRESHOLD_MS = float(os.environ.get("SLOW_REQUEST_THRESHOLD_MS", "2000"))
+PROFILE_MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", "60"))
+
+# Leaf frames of threads that are blocked, not running - left out of "cpu" profiles
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+    ("socket.py", "accept"),
+    ("handlers.py", "dequeue"),
+}
+
+# Only one profile runs at a time - sampling costs CPU on the worker being profiled
+_profile_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Another profile is already running in this worker"""
+
+
+def stage_breakdown(stages: Dict[str, List[float]]) -> Dict[str, float]:
+    """Total milliseconds per stage (concurrent calls of a stage are added up)"""
+    return {stage: round(sum(durations) * 1000, 1) for stage, durations in stages.items()}
+
+
+def server_timing_header(stages: Dict[str, List[float]], total: float) -> str:
+    """Server-Timing value with one metric per stage and the total request time"""
+    metrics = [
+        f'{stage};dur={sum(durations) * 1000:.1f};desc="{len(durations)} calls"'
+        if len(durations) > 1 else f"{stage};dur={durations[0] * 1000:.1f}"
+        for stage, durations in stages.items()
+    ]
+    metrics.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(metrics)
+
+
+def log_slow_request(method: str, route: str, status: int, total: float, stages: Dict[str, List[float]]):
+    """Log the stage breakdown of a request slower than SLOW_REQUEST_THRESHOLD_MS"""
+    duration_ms = total * 1000
+    if duration_ms < SLOW_REQUEST_THRESHOLD_MS:
+        return
+    logger.warning(
+        "Slow request %s %s took %.0fms", method, route, duration_ms,
+        extra={"status": status, "duration_ms": round(duration_ms, 1), "stages": stage_breakdown(stages)}
+    )
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float, interval: float = 0.01, mode: str = "cpu") -> str:
+    """
+    Sample the stacks of all threads for `seconds` and return them as
+    collapsed stacks ("thread;outer;...;inner count" per line)
+
+    In "cpu" mode, threads blocked in a wait, queue get or select are left
+    out. "wall" mode keeps them, to see where requests are waiting.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy("a profile is already running")
+    try:
+        own_thread = threading.get_ident()
+        samples: Counter = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                code = frame.f_code
+                if mode == "cpu" and (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                samples[";".join(reversed(stack))] += 1
+            time.sleep(interval)
+    finally:
+        _profile_lock.release()
+
+    logger.info("Profiled %.1fs: %d samples, %d distinct stacks", seconds, sum(samples.values()), len(samples))
+    return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
@@ -1,98 +1,382 @@
 # apps/backend/rag_service.py
+import hashlib
 import json
+import logging
 import os
+import threading
+import time
 from typing import Optional, List, Dict
-import chromadb
-from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
+from catalog import Catalog
+from embedding_service import encode_queries, get_embedding_model, is_embedding_model_loaded
+from metrics import track_stage
+from normalization import fold_accents, normalize_destination
+from vector_index import VectorIndex
 
-# Initialize ChromaDB client
-chroma_client = chromadb.Client(Settings(
-    persist_directory="./chroma_db",
-    anonymized_telemetry=False
-))
+logger = logging.getLogger(__name__)
 
-# Initialize embedding model
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+# Vector database location and embedding batch size for ingestion
+CHROMA_PERSIST_DIRECTORY = os.environ.get("CHROMA_PERSIST_DIRECTORY", "./chroma_db")
+RAG_EMBED_BATCH_SIZE = int(os.environ.get("RAG_EMBED_BATCH_SIZE", "64"))
+
+# Semantic search backend: "chroma", or "numpy" for the in-process memory-mapped
+# index exported from Chroma (see vector_index.py)
+RAG_VECTOR_BACKEND = os.environ.get("RAG_VECTOR_BACKEND", "chroma").lower()
+RAG_VECTOR_INDEX_PATH = os.environ.get("RAG_VECTOR_INDEX_PATH", "./vector_index")
+# Compact destination catalog used for exact matches and returned records (see catalog.py)
+RAG_CATALOG_PATH = os.environ.get("RAG_CATALOG_PATH", "./snapshots/destinations.catalog")
+# How often (seconds) workers check whether the catalog file was rewritten (e.g. by manage.py ingest)
+RAG_CATALOG_CHECK_INTERVAL = float(os.environ.get("RAG_CATALOG_CHECK_INTERVAL", "5"))
+
+# The ChromaDB client is expensive to import, so it is created on first use
+# (or by warm_up) rather than at import time
+_chroma_client = None
+_chroma_lock = threading.Lock()
+
+# Loaded numpy index and the file version it was loaded from
+_vector_index: Optional[VectorIndex] = None
+_vector_index_version = None
+_vector_index_lock = threading.Lock()
 
 # Collection name
 COLLECTION_NAME = "destinations"
 
+# Exact-match index and source of returned destination records. Reloaded
+# lazily whenever the collection version or the catalog file changes.
+_collection_version = 0
+_name_index: Optional[Catalog] = None
+_name_index_version = -1
+_name_index_file = None
+_name_index_next_check = 0.0
+_name_index_lock = threading.Lock()
+
+def get_chroma_client():
+    """Return the persistent ChromaDB client, creating it on first use"""
+    global _chroma_client
+    if _chroma_client is None:
+        with _chroma_lock:
+            if _chroma_client is None:
+                import chromadb
+                from chromadb.config import Settings
+                _chroma_client = chromadb.PersistentClient(
+                    path=CHROMA_PERSIST_DIRECTORY,
+                    settings=Settings(anonymized_telemetry=False)
+                )
+    return _chroma_client
+
+def is_vector_db_ready() -> bool:
+    loaded = _vector_index is not None if RAG_VECTOR_BACKEND == "numpy" else _chroma_client is not None
+    return loaded and _name_index_version == _collection_version
+
+def warm_up():
+    """Load the embedding model, open the vector database and build the name index"""
+    get_embedding_model()
+    collection = _get_collection()
+    if collection is not None:
+        _get_name_index(collection)
+
 def load_destinations_data():
     """Load destinations data from JSON file"""
     json_path = os.path.join(os.path.dirname(__file__), "less_known_destinations_data.json")
     
     if not os.path.exists(json_path):
-        print(f"WARNING - less_known_destinations_data.json not found at {json_path}")
+        logger.warning("less_known_destinations_data.json not found at %s", json_path)
         return []
     
     with open(json_path, 'r', encoding='utf-8') as f:
         return json.load(f)
 
-def initialize_rag_database():
-    """Initialize or update the RAG database with destinations data"""
-    print("INFO - Initializing RAG database...")
+def destination_id(dest: Dict) -> str:
+    """Stable document ID derived from the destination name and country"""
+    key = f"{fold_accents(normalize_destination(dest['destination']))}|{fold_accents(normalize_destination(dest['country']))}"
+    return "dest_" + hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+def _content_hash(dest: Dict) -> str:
+    """Hash of the full destination record - changes whenever any field changes"""
+    return hashlib.sha256(json.dumps(dest, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def _build_document(dest: Dict) -> str:
+    """Create a comprehensive text for embedding"""
+    doc_text = f"{dest['destination']}, {dest['country']}. {dest['description']}"
     
-    # Load data
-    destinations = load_destinations_data()
+    # Add activities info
+    activities_text = " Activities: " + ", ".join([
+        f"{act['activity']}: {act['description']}" 
+        for act in dest.get('activities', [])
+    ])
+    return doc_text + activities_text
+
+def sync_rag_database(batch_size: Optional[int] = None) -> Dict[str, int]:
+    """
+    Incrementally sync the RAG database with the destinations data
     
-    if not destinations:
-        print("WARNING - No destinations data to load")
-        return
+    Each destination gets a stable ID and a content hash. Only new or changed
+    destinations are embedded and upserted, and destinations removed from the
+    data file are deleted from the collection.
     
-    # Get or create collection
-    try:
-        collection = chroma_client.get_collection(name=COLLECTION_NAME)
-        print(f"INFO - Found existing collection with {collection.count()} documents")
-        # Delete and recreate to update
-        chroma_client.delete_collection(name=COLLECTION_NAME)
-        print("INFO - Deleted old collection")
-    except:
-        print("INFO - No existing collection found")
+    Args:
+        batch_size: Number of documents embedded and upserted at once
+                    (defaults to RAG_EMBED_BATCH_SIZE)
     
-    collection = chroma_client.create_collection(
+    Returns:
+        Counts of 'added', 'updated', 'deleted' and 'unchanged' destinations
+    """
+    batch_size = batch_size or RAG_EMBED_BATCH_SIZE
+    logger.info("Syncing RAG database...")
+    
+    # Load data
+    destinations = load_destinations_data()
+    
+    collection = get_chroma_client().get_or_create_collection(
         name=COLLECTION_NAME,
         metadata={"description": "Travel destinations and activities"}
     )
     
-    # Prepare documents for embedding
-    documents = []
-    metadatas = []
-    ids = []
+    existing = collection.get(include=['metadatas'])
+    existing_hashes = {
+        doc_id: (metadata or {}).get('content_hash')
+        for doc_id, metadata in zip(existing['ids'], existing['metadatas'])
+    }
     
-    for idx, dest in enumerate(destinations):
-        # Create a comprehensive text for embedding
-        doc_text = f"{dest['destination']}, {dest['country']}. {dest['description']}"
-        
-        # Add activities info
-        activities_text = " Activities: " + ", ".join([
-            f"{act['activity']}: {act['description']}" 
-            for act in dest.get('activities', [])
-        ])
-        doc_text += activities_text
+    # Work out what changed
+    wanted = {}
+    for dest in destinations:
+        doc_id = destination_id(dest)
+        if doc_id in wanted:
+            logger.warning("Duplicate destination skipped: %s, %s", dest['destination'], dest['country'])
+            continue
+        wanted[doc_id] = dest
+    
+    changed = [
+        (doc_id, dest, _content_hash(dest))
+        for doc_id, dest in wanted.items()
+    ]
+    changed = [item for item in changed if existing_hashes.get(item[0]) != item[2]]
+    removed = [doc_id for doc_id in existing_hashes if doc_id not in wanted]
+    
+    stats = {
+        "added": sum(1 for doc_id, _, _ in changed if doc_id not in existing_hashes),
+        "updated": sum(1 for doc_id, _, _ in changed if doc_id in existing_hashes),
+        "deleted": len(removed),
+        "unchanged": len(wanted) - len(changed)
+    }
+    
+    # Embed and upsert new/changed destinations in batches
+    for start in range(0, len(changed), batch_size):
+        batch = changed[start:start + batch_size]
+        documents = [_build_document(dest) for _, dest, _ in batch]
+        logger.info("Generating embeddings for destinations %d-%d of %d...", start + 1, start + len(batch), len(changed))
+        embeddings = get_embedding_model().encode(documents, batch_size=batch_size).tolist()
         
-        documents.append(doc_text)
-        metadatas.append({
-            "destination": dest['destination'],
-            "country": dest['country'],
-            "description": dest['description'],
-            "activities": json.dumps(dest.get('activities', []))
-        })
-        ids.append(f"dest_{idx}")
-    
-    # Generate embeddings
-    print(f"INFO - Generating embeddings for {len(documents)} destinations...")
-    embeddings = embedding_model.encode(documents).tolist()
-    
-    # Add to collection
-    collection.add(
-        documents=documents,
-        embeddings=embeddings,
-        metadatas=metadatas,
-        ids=ids
+        collection.upsert(
+            ids=[doc_id for doc_id, _, _ in batch],
+            documents=documents,
+            embeddings=embeddings,
+            metadatas=[{
+                "destination": dest['destination'],
+                "country": dest['country'],
+                "description": dest['description'],
+                "aliases": json.dumps(dest.get('aliases', [])),
+                "activities": json.dumps(dest.get('activities', [])),
+                "content_hash": content_hash
+            } for _, dest, content_hash in batch]
+        )
+    
+    if removed:
+        collection.delete(ids=removed)
+    
+    logger.info(
+        "RAG database synced: %d added, %d updated, %d deleted, %d unchanged",
+        stats['added'], stats['updated'], stats['deleted'], stats['unchanged']
+    )
+    if changed or removed:
+        _mark_collection_changed()
+    if RAG_VECTOR_BACKEND == "numpy" and (changed or removed or VectorIndex.version(RAG_VECTOR_INDEX_PATH) is None):
+        export_vector_index(collection)
+    if changed or removed or not os.path.exists(RAG_CATALOG_PATH):
+        export_catalog(collection)
+    return stats
+
+def export_vector_index(collection=None):
+    """Write all embeddings and metadata of the Chroma collection to the numpy index"""
+    if collection is None:
+        collection = get_chroma_client().get_collection(name=COLLECTION_NAME)
+    data = collection.get(include=['embeddings', 'metadatas'])
+    VectorIndex.save(RAG_VECTOR_INDEX_PATH, data['ids'], data['embeddings'], data['metadatas'])
+    logger.info("Exported %d destinations to the vector index at %s", len(data['ids']), RAG_VECTOR_INDEX_PATH)
+
+def _catalog_data(collection):
+    """Destination records and lookup keys (key -> record index) of every destination in the collection"""
+    records, keys = [], {}
+    for metadata in collection.get(include=['metadatas'])['metadatas']:
+        record = _parse_record(metadata)
+        aliases = json.loads(metadata.get('aliases') or '[]')
+        for key in index_keys(record['destination'], record['country'], aliases):
+            # First destination wins if two share an alias
+            keys.setdefault(key, len(records))
+        records.append(record)
+    return records, keys
+
+def export_catalog(collection=None):
+    """Write every destination of the collection to the compact catalog file"""
+    if collection is None:
+        collection = get_chroma_client().get_collection(name=COLLECTION_NAME)
+    records, keys = _catalog_data(collection)
+    Catalog.save(RAG_CATALOG_PATH, records, keys)
+    logger.info("Exported %d destinations to the catalog at %s", len(records), RAG_CATALOG_PATH)
+
+def _mark_collection_changed():
+    """Invalidate the exact-match name index after the collection was modified"""
+    global _collection_version
+    with _name_index_lock:
+        _collection_version += 1
+
+def index_keys(name: str, country: str, aliases: List[str]) -> set:
+    """All lookup keys for a destination: name, "name, country", aliases and accent-folded forms"""
+    keys = set()
+    for variant in [name, f"{name}, {country}", *aliases]:
+        normalized = normalize_destination(variant)
+        keys.add(normalized)
+        keys.add(fold_accents(normalized))
+    return keys
+
+def _parse_record(metadata: Dict) -> Dict:
+    """Turn Chroma metadata into a destination record with parsed activities"""
+    activities = json.loads(metadata['activities'])
+    
+    # Ensure each activity has a link field (will be filled by Google Places API later)
+    for activity in activities:
+        if 'link' not in activity:
+            activity['link'] = ''
+    
+    return {
+        "destination": metadata['destination'],
+        "country": metadata['country'],
+        "description": metadata['description'],
+        "activities": activities
+    }
+
+def _catalog_file_stat():
+    try:
+        stat = os.stat(RAG_CATALOG_PATH)
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+    except OSError:
+        return None
+
+def _get_name_index(collection) -> Catalog:
+    """
+    Return the destination catalog, loading it again when the collection
+    changed in this process or another process rewrote the file (checked at
+    most every RAG_CATALOG_CHECK_INTERVAL seconds)
+
+    The catalog file is written on ingest; if it is missing it is built from
+    the collection (and saved for the other workers).
+    """
+    global _name_index, _name_index_version, _name_index_file, _name_index_next_check
+    now = time.monotonic()
+    if _name_index_version == _collection_version and now < _name_index_next_check:
+        return _name_index
+    
+    with _name_index_lock:
+        _name_index_next_check = now + RAG_CATALOG_CHECK_INTERVAL
+        file_version = _catalog_file_stat()
+        if _name_index_version != _collection_version or file_version != _name_index_file:
+            version = _collection_version
+            catalog = Catalog.load(RAG_CATALOG_PATH)
+            if catalog is None:
+                records, keys = _catalog_data(collection)
+                try:
+                    Catalog.save(RAG_CATALOG_PATH, records, keys)
+                    catalog = Catalog.load(RAG_CATALOG_PATH)
+                except OSError as e:
+                    logger.warning("Could not save destination catalog to %s: %s", RAG_CATALOG_PATH, e)
+                if catalog is None:
+                    catalog = Catalog(Catalog.build(records, keys))
+                file_version = _catalog_file_stat()
+            _name_index = catalog
+            _name_index_version = version
+            _name_index_file = file_version
+            logger.info("Loaded destination catalog: %s", catalog.stats())
+    return _name_index
+
+def _get_vector_index() -> Optional[VectorIndex]:
+    """
+    Return the memory-mapped numpy index, exporting it from Chroma first if it
+    doesn't exist, and reloading it when another process rewrote it
+    """
+    global _vector_index, _vector_index_version
+    version = VectorIndex.version(RAG_VECTOR_INDEX_PATH)
+    if _vector_index is not None and version == _vector_index_version:
+        return _vector_index
+
+    with _vector_index_lock:
+        version = VectorIndex.version(RAG_VECTOR_INDEX_PATH)
+        if _vector_index is None or version != _vector_index_version:
+            if version is None:
+                logger.warning("Vector index not found at %s, exporting it from Chroma...", RAG_VECTOR_INDEX_PATH)
+                if _get_chroma_collection() is None:
+                    return None
+                # sync_rag_database may already have exported it
+                if VectorIndex.version(RAG_VECTOR_INDEX_PATH) is None:
+                    export_vector_index()
+                version = VectorIndex.version(RAG_VECTOR_INDEX_PATH)
+            index = VectorIndex.load(RAG_VECTOR_INDEX_PATH)
+            if index is None:
+                return _vector_index
+            if _vector_index is not None:
+                _mark_collection_changed()
+            _vector_index, _vector_index_version = index, version
+            logger.info("Loaded vector index with %d destinations", len(index))
+    return _vector_index
+
+def _get_collection():
+    """Return the search backend: the numpy index or the Chroma collection"""
+    if RAG_VECTOR_BACKEND == "numpy":
+        return _get_vector_index()
+    return _get_chroma_collection()
+
+def _get_chroma_collection():
+    """Return the destinations collection, ingesting it first if it doesn't exist"""
+    try:
+        return get_chroma_client().get_collection(name=COLLECTION_NAME)
+    except:
+        logger.warning("RAG collection not found. Run 'python manage.py ingest'. Ingesting now...")
+        sync_rag_database()
+        try:
+            return get_chroma_client().get_collection(name=COLLECTION_NAME)
+        except:
+            logger.error("Failed to initialize RAG database")
+            return None
+
+def _query_embeddings(collection, queries: List[str]):
+    """Embed queries (cached and micro-batched) - as an array for the numpy index, as lists for Chroma"""
+    embeddings = encode_queries(queries)
+    return embeddings if isinstance(collection, VectorIndex) else embeddings.tolist()
+
+def _exact_match(name_index: Catalog, query: str) -> Optional[Dict]:
+    """Look up normalized name, "name, country", aliases or accent-folded forms"""
+    index = name_index.find(query)
+    if index is None:
+        return None
+    record = name_index.record(index)
+    logger.info("Exact match found for: %s", record['destination'])
+    return record
+
+def _semantic_match(name_index: Catalog, query: str, metadata: Dict, distance: Optional[float]) -> Optional[Dict]:
+    """Accept the nearest neighbour only if it is close enough to the query"""
+    # Use stricter threshold for semantic search (0.5)
+    # This prevents "Nitrianske Rudno" from matching "Nitrianske Pravno"
+    if distance is not None and distance > 0.5:
+        logger.info("Match found but similarity too low (distance: %.2f) for: %s", distance, query)
+        return None
+    
+    logger.info(
+        "Semantic match found for: %s (distance: %.2f, similarity: %.2f)",
+        metadata['destination'], distance, 1 - distance
     )
     
-    print(f"SUCCESS - Added {len(documents)} destinations to RAG database")
+    # Materialize the record from the catalog instead of parsing the metadata JSON
+    index = name_index.find(metadata['destination'])
+    return name_index.record(index) if index is not None else _parse_record(metadata)
 
 def search_destination(query: str, n_results: int = 1) -> Optional[Dict]:
     """
@@ -105,81 +389,84 @@ def search_destination(query: str, n_results: int = 1) -> Optional[Dict]:
     Returns:
         Destination data if found, None otherwise
     """
-    try:
-        collection = chroma_client.get_collection(name=COLLECTION_NAME)
-    except:
-        print("WARNING - RAG collection not found. Initializing...")
-        initialize_rag_database()
-        try:
-            collection = chroma_client.get_collection(name=COLLECTION_NAME)
-        except:
-            print("ERROR - Failed to initialize RAG database")
-            return None
+    collection = _get_collection()
+    if collection is None:
+        return None
     
-    # First, try exact string match (case-insensitive)
-    all_results = collection.get()
-    query_lower = query.lower().strip()
-    
-    for idx, metadata in enumerate(all_results['metadatas']):
-        dest_name = metadata['destination'].lower().strip()
-        if dest_name == query_lower:
-            print(f"INFO - Exact match found for: {metadata['destination']}")
-            activities = json.loads(metadata['activities'])
-            
-            # Ensure each activity has a link field
-            for activity in activities:
-                if 'link' not in activity:
-                    activity['link'] = ''
-            
-            return {
-                "destination": metadata['destination'],
-                "country": metadata['country'],
-                "description": metadata['description'],
-                "activities": activities
-            }
+    # First, try exact match on the name index
+    name_index = _get_name_index(collection)
+    with track_stage("rag_exact_match"):
+        record = _exact_match(name_index, query)
+    if record:
+        return record
     
     # If no exact match, try semantic search
-    print(f"INFO - No exact match, trying semantic search for: {query}")
+    logger.info("No exact match, trying semantic search for: %s", query)
     
     # Generate query embedding
-    query_embedding = embedding_model.encode([query]).tolist()
+    query_embedding = _query_embeddings(collection, [query])
     
     # Search
-    results = collection.query(
-        query_embeddings=query_embedding,
-        n_results=n_results
-    )
+    with track_stage("rag_semantic_query"):
+        results = collection.query(
+            query_embeddings=query_embedding,
+            n_results=n_results
+        )
     
     if not results['ids'] or not results['ids'][0]:
-        print(f"INFO - No RAG data found for: {query}")
+        logger.info("No RAG data found for: %s", query)
         return None
     
     # Get the best match
     metadata = results['metadatas'][0][0]
     distance = results['distances'][0][0] if 'distances' in results else None
     
-    # Use stricter threshold for semantic search (0.5)
-    # This prevents "Nitrianske Rudno" from matching "Nitrianske Pravno"
-    if distance is not None and distance > 0.5:
-        print(f"INFO - Match found but similarity too low (distance: {distance:.2f}) for: {query}")
-        return None
+    return _semantic_match(name_index, query, metadata, distance)
+
+def search_destinations_batch(queries: List[str]) -> Dict[str, Optional[Dict]]:
+    """
+    Search for many destinations at once
     
-    print(f"INFO - Semantic match found for: {metadata['destination']} (distance: {distance:.2f}, similarity: {1-distance:.2f})")
+    Exact matches come from the name index; all remaining queries are
+    embedded in a single encode call (even beyond EMBEDDING_MAX_BATCH) and
+    sent as one multi-query search.
     
-    # Parse activities back from JSON
-    activities = json.loads(metadata['activities'])
+    Args:
+        queries: Destination names to search for
     
-    # Ensure each activity has a link field (will be filled by Google Places API later)
-    for activity in activities:
-        if 'link' not in activity:
-            activity['link'] = ''  # Placeholder, will be updated by places_service
+    Returns:
+        Dict mapping each query to its destination data, or None if not found
+    """
+    results: Dict[str, Optional[Dict]] = {query: None for query in queries}
+    collection = _get_collection()
+    if collection is None or not queries:
+        return results
     
-    return {
-        "destination": metadata['destination'],
-        "country": metadata['country'],
-        "description": metadata['description'],
-        "activities": activities
-    }
+    name_index = _get_name_index(collection)
+    misses = []
+    for query in results:
+        record = _exact_match(name_index, query)
+        if record:
+            results[query] = record
+        else:
+            misses.append(query)
+    
+    if not misses:
+        return results
+    
+    logger.info("No exact match for %d destination(s), trying batched semantic search", len(misses))
+    query_embeddings = _query_embeddings(collection, misses)
+    with track_stage("rag_semantic_query"):
+        matches = collection.query(query_embeddings=query_embeddings, n_results=1)
+    
+    for i, query in enumerate(misses):
+        if not matches['ids'] or not matches['ids'][i]:
+            continue
+        metadata = matches['metadatas'][i][0]
+        distance = matches['distances'][i][0] if 'distances' in matches else None
+        results[query] = _semantic_match(name_index, query, metadata, distance)
+    
+    return results
 
 def get_rag_recommendations(destination: str) -> Optional[List[Dict]]:
     """
@@ -194,13 +481,7 @@ def get_rag_recommendations(destination: str) -> Optional[List[Dict]]:
     result = search_destination(destination)
     
     if result and 'activities' in result:
-        print(f"SUCCESS - Using RAG data for {destination}")
+        logger.info("Using RAG data for %s", destination)
         return result['activities']
     
     return None
-
-# Initialize database on module import
-try:
-    initialize_rag_database()
-except Exception as e:
-    print(f"WARNING - Failed to initialize RAG database on startup: {e}")
@@ -0,0 +1,271 @@
+# apps/backend/recommendation_cache.py
+import base64
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+import numpy as np
+from cache import MISSING, create_shared_cache
+from embedding_service import encode_queries
+from normalization import normalize_destination
+
+logger = logging.getLogger(__name__)
+
+RECOMMENDATION_CACHE_TTL = int(os.environ.get("RECOMMENDATION_CACHE_TTL", str(24 * 3600)))
+RECOMMENDATION_CACHE_SIZE = int(os.environ.get("RECOMMENDATION_CACHE_SIZE", "2000"))
+# Minimum cosine similarity for a nearest-neighbour hit ("paris, france" vs "paris")
+RECOMMENDATION_CACHE_SIMILARITY = float(os.environ.get("RECOMMENDATION_CACHE_SIMILARITY", "0.88"))
+# Seconds past the TTL that a response is still served while it is regenerated
+RECOMMENDATION_STALE_TTL = int(os.environ.get("RECOMMENDATION_STALE_TTL", "3600"))
+# Set to an empty string to keep the cache in memory only
+RECOMMENDATION_CACHE_PATH = os.environ.get("RECOMMENDATION_CACHE_PATH", "./cache/recommendations.db")
+
+
+def weather_bucket(weather: Optional[dict]) -> str:
+    """
+    Reduce weather data to a coarse bucket so recommendations can be reused
+    while the conditions are similar, e.g. "mild:rain" or "hot:clear"
+    """
+    if not weather or "error" in weather:
+        return "unknown"
+
+    temperature = weather.get("temperature", 0)
+    if temperature < 0:
+        band = "freezing"
+    elif temperature < 10:
+        band = "cold"
+    elif temperature < 20:
+        band = "mild"
+    elif temperature < 28:
+        band = "warm"
+    else:
+        band = "hot"
+
+    description = weather.get("description", "").lower()
+    if "snow" in description or "sleet" in description:
+        sky = "snow"
+    elif any(word in description for word in ("rain", "drizzle", "thunderstorm", "shower")):
+        sky = "rain"
+    else:
+        sky = "clear"
+
+    return f"{band}:{sky}"
+
+
+class RecommendationCache:
+    """
+    Cache of Gemini responses keyed by normalized destination + weather bucket
+    (+ prompt variant, for responses with a non-default activity count or fields).
+
+    Exact key misses fall back to a nearest-neighbour search over destination
+    embeddings within the same weather bucket. Entries are TTL and size
+    bounded and mirrored to SQLite so they survive restarts. Expired entries
+    are still returned by get_entry() for `stale_ttl` seconds, so the caller
+    can serve them while it regenerates the response.
+
+    With a `shared` cache (CACHE_BACKEND sqlite or redis), entries are also
+    written there, so an exact hit computed by one worker serves all of
+    them. Semantic matches only use the entries this worker has seen.
+    """
+
+    def __init__(self, path: str = "", maxsize: int = 2000, ttl: float = 86400,
+                 similarity_threshold: float = 0.88, shared=None, stale_ttl: float = 0):
+        self.maxsize = maxsize
+        self._shared = shared
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        # key -> (destination, bucket, response, embedding, expires_at), oldest first
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+        self._conn = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS recommendations ("
+                " key TEXT PRIMARY KEY,"
+                " destination TEXT NOT NULL,"
+                " bucket TEXT NOT NULL,"
+                " response TEXT NOT NULL,"
+                " embedding BLOB NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+            self._load()
+
+    def _load(self):
+        """Load non-expired entries from disk, newest last"""
+        now = time.time()
+        self._conn.execute("DELETE FROM recommendations WHERE expires_at < ?", (now - self.stale_ttl,))
+        self._conn.commit()
+        rows = self._conn.execute(
+            "SELECT key, destination, bucket, response, embedding, expires_at"
+            " FROM recommendations ORDER BY expires_at DESC LIMIT ?",
+            (self.maxsize,)
+        ).fetchall()
+        for key, destination, bucket, response, embedding, expires_at in reversed(rows):
+            vector = np.frombuffer(embedding, dtype=np.float32)
+            self._entries[key] = (destination, bucket, response, vector, expires_at)
+        if rows:
+            logger.info("Loaded %d cached recommendations from disk", len(rows))
+
+    @staticmethod
+    def _key(destination: str, bucket: str) -> str:
+        return f"{destination}|{bucket}"
+
+    @staticmethod
+    def _embed(destination: str) -> np.ndarray:
+        # Shares the query-embedding cache with RAG searches for the same destination
+        vector = encode_queries([destination])[0]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    @staticmethod
+    def _bucket(weather: Optional[dict], variant: str) -> str:
+        # Responses of other prompt variants are never served, not even as semantic matches
+        bucket = weather_bucket(weather)
+        return f"{bucket}|{variant}" if variant else bucket
+
+    def get(self, destination: str, weather: Optional[dict], variant: str = "") -> Optional[str]:
+        """Return a fresh cached response for the destination, weather and prompt variant, or None"""
+        entry = self.get_entry(destination, weather, variant)
+        return entry[0] if entry is not None and entry[1] > 0 else None
+
+    def get_entry(self, destination: str, weather: Optional[dict],
+                  variant: str = "") -> Optional[Tuple[str, float]]:
+        """
+        Return (response, remaining_ttl) for the destination, weather and
+        prompt variant, or None. remaining_ttl is negative for a stale response.
+        """
+        normalized = normalize_destination(destination)
+        bucket = self._bucket(weather, variant)
+        key = self._key(normalized, bucket)
+        now = time.time()
+        oldest = now - self.stale_ttl
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[4] >= oldest:
+                self.hits += 1
+                return entry[2], entry[4] - now
+
+        shared_entry = self._get_shared(key)
+        if shared_entry is not None:
+            return shared_entry
+
+        with self._lock:
+            candidates = [
+                (cached_destination, response, vector, expires_at)
+                for cached_destination, cached_bucket, response, vector, expires_at in self._entries.values()
+                if cached_bucket == bucket and expires_at >= oldest
+            ]
+
+        if candidates:
+            query_vector = self._embed(normalized)
+            similarities = np.stack([candidate[2] for candidate in candidates]) @ query_vector
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.similarity_threshold:
+                logger.info(
+                    "Semantic cache hit: '%s' ~ '%s' (similarity: %.2f)",
+                    destination, candidates[best][0], similarities[best]
+                )
+                with self._lock:
+                    self.semantic_hits += 1
+                return candidates[best][1], candidates[best][3] - now
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _get_shared(self, key: str) -> Optional[Tuple[str, float]]:
+        """Exact lookup in the shared cache; hits join this worker's semantic index"""
+        if self._shared is None:
+            return None
+        entry = self._shared.get_entry(key)
+        if entry is MISSING:
+            return None
+        value, remaining_ttl = entry
+        # The shared copy is kept for the stale period too
+        remaining_ttl -= self.stale_ttl
+        vector = np.frombuffer(base64.b64decode(value["embedding"]), dtype=np.float32)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value["destination"], value["bucket"], value["response"], vector,
+                                  time.time() + remaining_ttl)
+            self._evict()
+            self.hits += 1
+        return value["response"], remaining_ttl
+
+    def put(self, destination: str, weather: Optional[dict], response: str, variant: str = ""):
+        """Store a response for the destination, weather and prompt variant"""
+        normalized = normalize_destination(destination)
+        bucket = self._bucket(weather, variant)
+        key = self._key(normalized, bucket)
+        vector = self._embed(normalized)
+        expires_at = time.time() + self.ttl
+
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (normalized, bucket, response, vector, expires_at)
+            evicted = self._evict()
+
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO recommendations"
+                    " (key, destination, bucket, response, embedding, expires_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, normalized, bucket, response, vector.tobytes(), expires_at)
+                )
+                if evicted:
+                    self._conn.executemany(
+                        "DELETE FROM recommendations WHERE key = ?", [(k,) for k in evicted]
+                    )
+                self._conn.commit()
+
+        if self._shared is not None:
+            self._shared.set(key, {
+                "destination": normalized,
+                "bucket": bucket,
+                "response": response,
+                "embedding": base64.b64encode(vector.astype(np.float32).tobytes()).decode("ascii")
+            }, self.ttl + self.stale_ttl)
+
+    def _evict(self) -> list:
+        """Drop entries past their stale period and the oldest ones above maxsize; return evicted keys"""
+        oldest = time.time() - self.stale_ttl
+        evicted = [key for key, entry in self._entries.items() if entry[4] < oldest]
+        for key in evicted:
+            del self._entries[key]
+        while len(self._entries) > self.maxsize:
+            key, _ = self._entries.popitem(last=False)
+            evicted.append(key)
+        return evicted
+
+    def stats(self) -> dict:
+        total = self.hits + self.semantic_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.semantic_hits) / total, 3) if total else 0.0
+        }
+
+
+recommendation_cache = RecommendationCache(
+    path=RECOMMENDATION_CACHE_PATH,
+    maxsize=RECOMMENDATION_CACHE_SIZE,
+    ttl=RECOMMENDATION_CACHE_TTL,
+    similarity_threshold=RECOMMENDATION_CACHE_SIMILARITY,
+    shared=create_shared_cache("recommendations", RECOMMENDATION_CACHE_SIZE * 20, RECOMMENDATION_CACHE_TTL),
+    stale_ttl=RECOMMENDATION_STALE_TTL
+)
@@ -0,0 +1,216 @@
+# apps/backend/refresh_ahead.py
+"""
+Refresh-ahead for popular destinations
+
+Requests are counted per (destination, prompt options, include_images) with
+exponentially decayed scores, so a destination that was busy an hour ago
+cools down. A background thread periodically takes the top-K and refreshes
+their weather, Gemini recommendations and Places results shortly before the
+cached copies expire, so hot destinations are (almost) always served from the
+cache. Refreshes share a per-minute budget and are skipped while an
+upstream's circuit is open or its rate limit is running low, so they never
+take capacity from live requests.
+"""
+import logging
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+from ai_agent import PromptOptions, is_known_destination, refresh_recommendation
+from llm_output import parse_activities
+from metrics import record_refresh_ahead
+from normalization import normalize_destination
+from places_service import refresh_places_ahead
+from recommendation_cache import recommendation_cache
+from resilience import TokenBucket, has_headroom
+from weather import get_cached_weather, get_weather_ttl, refresh_weather
+
+logger = logging.getLogger(__name__)
+
+REFRESH_AHEAD_ENABLED = os.environ.get("REFRESH_AHEAD_ENABLED", "true").lower() in ("1", "true", "yes")
+# Number of hot destinations kept fresh, and the decayed request count they need
+REFRESH_TOP_K = int(os.environ.get("REFRESH_TOP_K", "20"))
+REFRESH_MIN_SCORE = float(os.environ.get("REFRESH_MIN_SCORE", "3"))
+# Seconds after which a request counts half as much
+REFRESH_HALF_LIFE = float(os.environ.get("REFRESH_HALF_LIFE", "900"))
+# Seconds between scheduler runs, and how long before expiry an entry is refreshed
+REFRESH_INTERVAL = float(os.environ.get("REFRESH_INTERVAL", "30"))
+REFRESH_LEAD_TIME = float(os.environ.get("REFRESH_LEAD_TIME", "90"))
+# Upstream calls per minute for all refreshes together (0 = no limit)
+REFRESH_BUDGET_PER_MINUTE = int(os.environ.get("REFRESH_BUDGET_PER_MINUTE", "30"))
+# Fraction of an upstream's rate limit burst that must be unused to refresh
+REFRESH_MIN_HEADROOM = float(os.environ.get("REFRESH_MIN_HEADROOM", "0.5"))
+
+
+class DecayedTopK:
+    """
+    Exponentially decayed counters, bounded to `capacity` keys
+
+    Scores are decayed lazily: each key keeps its score and the time it was
+    last updated. When the table is full, the lowest-scoring half is dropped.
+    """
+
+    def __init__(self, half_life: float, capacity: int = 1000):
+        self.capacity = capacity
+        self._decay = math.log(2) / half_life
+        self._entries: Dict[Hashable, Tuple[float, float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _score(self, score: float, updated: float, now: float) -> float:
+        return score * math.exp(-self._decay * (now - updated))
+
+    def record(self, key: Hashable, value: Any = None, weight: float = 1):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            score = weight if entry is None else self._score(entry[0], entry[1], now) + weight
+            self._entries[key] = (score, now, value)
+            if len(self._entries) > self.capacity:
+                self._prune(now)
+
+    def _prune(self, now: float):
+        ranked = sorted(self._entries, key=lambda key: self._score(*self._entries[key][:2], now))
+        for key in ranked[:len(ranked) - self.capacity // 2]:
+            del self._entries[key]
+
+    def top(self, k: int, min_score: float = 0) -> List[Tuple[Hashable, float, Any]]:
+        """The k highest (key, score, value) with a score of at least min_score"""
+        now = time.monotonic()
+        with self._lock:
+            scored = [(key, self._score(score, updated, now), value)
+                      for key, (score, updated, value) in self._entries.items()]
+        scored = [entry for entry in scored if entry[1] >= min_score]
+        scored.sort(key=lambda entry: entry[1], reverse=True)
+        return scored[:k]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RefreshScheduler:
+    """Background thread refreshing the cached data of the top-K destinations"""
+
+    def __init__(self, top_k: int = REFRESH_TOP_K, half_life: float = REFRESH_HALF_LIFE,
+                 min_score: float = REFRESH_MIN_SCORE, interval: float = REFRESH_INTERVAL,
+                 lead_time: float = REFRESH_LEAD_TIME, budget_per_minute: int = REFRESH_BUDGET_PER_MINUTE,
+                 min_headroom: float = REFRESH_MIN_HEADROOM):
+        self.top_k = top_k
+        self.min_score = min_score
+        self.interval = interval
+        self.lead_time = lead_time
+        self.min_headroom = min_headroom
+        self._counts = DecayedTopK(half_life, capacity=max(1000, top_k * 10))
+        self._budget = TokenBucket(rate=budget_per_minute / 60, burst=budget_per_minute)
+        # Snapshot and RAG destinations don't use Gemini or Places
+        self._known: Dict[str, bool] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.runs = 0
+
+    def record(self, destination: str, options: PromptOptions, include_images: bool):
+        """Count one request for a destination"""
+        self._counts.record((normalize_destination(destination), options, include_images), destination)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="refresh-ahead", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.exception("Refresh-ahead run failed: %s: %s", type(e).__name__, e)
+
+    def run_once(self):
+        """Refresh whatever of the current top-K is about to expire"""
+        self.runs += 1
+        refreshed_weather = set()
+        for (normalized, options, include_images), _, destination in self._counts.top(self.top_k, self.min_score):
+            if self._stop.is_set():
+                return
+            if normalized not in refreshed_weather:
+                refreshed_weather.add(normalized)
+                self._refresh_weather(destination)
+            if not self._is_known(normalized, destination):
+                self._refresh_recommendation(destination, options, include_images)
+
+    def _allow(self, kind: str, upstream: str) -> bool:
+        """Whether a refresh may call the upstream now: headroom first, then the budget"""
+        if not has_headroom(upstream, self.min_headroom):
+            record_refresh_ahead(kind, "skipped_headroom")
+            return False
+        if not self._budget.acquire(0):
+            record_refresh_ahead(kind, "skipped_budget")
+            return False
+        return True
+
+    def _is_known(self, normalized: str, destination: str) -> bool:
+        known = self._known.get(normalized)
+        if known is None:
+            if len(self._known) >= self._counts.capacity:
+                self._known.clear()
+            known = self._known[normalized] = is_known_destination(destination)
+        return known
+
+    def _refresh_weather(self, destination: str):
+        ttl = get_weather_ttl(destination)
+        if ttl is not None and ttl > self.lead_time:
+            return
+        if not self._allow("weather", "openweather"):
+            return
+        weather_data = refresh_weather(destination)
+        record_refresh_ahead("weather", "error" if "error" in weather_data else "ok")
+
+    def _refresh_recommendation(self, destination: str, options: PromptOptions, include_images: bool):
+        # Never fetch weather here: _refresh_weather already spent (or was denied) the budget for it
+        weather_data = get_cached_weather(destination, revalidate=False)
+        if weather_data is None:
+            return
+        entry = recommendation_cache.get_entry(destination, weather_data, options.variant)
+        recommendation = entry[0] if entry is not None else None
+        if entry is None or entry[1] <= self.lead_time:
+            if not self._allow("recommendation", "gemini"):
+                return
+            recommendation = refresh_recommendation(destination, weather_data, options)
+            activities = parse_activities(recommendation).activities
+            record_refresh_ahead("recommendation", "ok" if activities else "error")
+        if include_images and recommendation:
+            self._refresh_places(destination, parse_activities(recommendation).activities[:options.count])
+
+    def _refresh_places(self, destination: str, activities: list):
+        try:
+            refreshed = refresh_places_ahead(
+                activities, destination, self.lead_time, lambda: self._allow("places", "google_places")
+            )
+        except Exception as e:
+            logger.warning("Refreshing places for %s failed: %s", destination, e)
+            record_refresh_ahead("places", "error")
+            return
+        if refreshed:
+            record_refresh_ahead("places", "ok", refreshed)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self._thread is not None,
+            "tracked": len(self._counts),
+            "runs": self.runs,
+            "hot": [
+                {"destination": destination, "count": options.count, "include_images": include_images,
+                 "score": round(score, 2)}
+                for (_, options, include_images), score, destination in self._counts.top(self.top_k, self.min_score)
+            ]
+        }
+
+
+refresh_scheduler = RefreshScheduler()
@@ -0,0 +1,355 @@
+# apps/backend/resilience.py
+"""
+Protection of upstream APIs (Google Places, OpenWeather, Gemini) against bursts:
+per-upstream token-bucket rate limiting, retries with jittered exponential
+backoff and a circuit breaker that fails fast while an upstream is unhealthy
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+# Defaults shared by all upstreams, overridable per upstream with <PREFIX>_* variables
+UPSTREAM_MAX_RETRIES = int(os.environ.get("UPSTREAM_MAX_RETRIES", "2"))
+UPSTREAM_BACKOFF_BASE = float(os.environ.get("UPSTREAM_BACKOFF_BASE", "0.2"))
+UPSTREAM_BACKOFF_MAX = float(os.environ.get("UPSTREAM_BACKOFF_MAX", "2"))
+# How long a caller may wait for a rate limiter token before failing fast
+RATE_LIMIT_MAX_WAIT = float(os.environ.get("RATE_LIMIT_MAX_WAIT", "2"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.environ.get("CIRCUIT_RESET_TIMEOUT", "30"))
+
+UPSTREAM_RETRIES = Counter(
+    "traivel_upstream_retries_total",
+    "Upstream calls retried after a throttling or transient error",
+    ("upstream",)
+)
+UPSTREAM_REJECTED = Counter(
+    "traivel_upstream_rejected_total",
+    "Upstream calls not made because the circuit was open or no rate limit token was available",
+    ("upstream", "reason")
+)
+CIRCUIT_TRANSITIONS = Counter(
+    "traivel_circuit_transitions_total",
+    "Circuit breaker state changes by upstream and new state",
+    ("upstream", "state")
+)
+
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling an upstream that is rate limited or has an open circuit"""
+
+    def __init__(self, upstream: str, reason: str):
+        super().__init__(f"{upstream} unavailable ({reason})")
+        self.upstream = upstream
+        self.reason = reason
+
+
+class RetryableError(Exception):
+    """Raised by callers for upstream responses worth retrying (e.g. HTTP 429 or 5xx)"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` calls per second with bursts of `burst`"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token if one is available, otherwise return the seconds until the next one"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def available(self) -> float:
+        """Tokens available right now (without taking one)"""
+        with self._lock:
+            return min(self.burst, self._tokens + (time.monotonic() - self._updated) * self.rate)
+
+    def acquire(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for a token. Returns False if none became available."""
+        if self.rate <= 0:
+            return True
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self._reserve()
+            if wait == 0:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    async def acquire_async(self, timeout: float) -> bool:
+        """acquire() for coroutines - waits without blocking the event loop"""
+        if self.rate <= 0:
+            return True
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self._reserve()
+            if wait == 0:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds, then lets one trial call through (half-open)
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def _set_state(self, state: str):
+        if state != self._state:
+            self._state = state
+            CIRCUIT_TRANSITIONS.inc(upstream=self.name, state=state)
+            log = logger.warning if state == self.OPEN else logger.info
+            log("Circuit for %s is now %s", self.name, state)
+
+    def allow(self) -> bool:
+        """Return whether a call may be made now"""
+        if self.failure_threshold <= 0:
+            return True
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._set_state(self.HALF_OPEN)
+            # Half-open: a single trial call decides whether to close or re-open
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or (
+                self.failure_threshold > 0 and self._failures >= self.failure_threshold
+            ):
+                self._opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+
+    def release(self):
+        """End a call whose outcome says nothing about the upstream's health"""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class Upstream:
+    """Rate limiter, retry policy and circuit breaker of one upstream API"""
+
+    def __init__(self, name: str, rate: float, burst: int, max_retries: int,
+                 is_retryable: Callable[[Exception], bool],
+                 failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self.max_retries = max_retries
+        self.is_retryable = is_retryable
+
+    def _backoff(self, attempt: int) -> float:
+        # "Full jitter": spreads retries of concurrent callers instead of synchronizing them
+        return random.uniform(0, min(UPSTREAM_BACKOFF_MAX, UPSTREAM_BACKOFF_BASE * 2 ** attempt))
+
+    def call(self, fn: Callable, *args, **kwargs):
+        """
+        Call fn through the rate limiter and circuit breaker, retrying
+        retryable errors with jittered exponential backoff
+
+        Raises:
+            UpstreamUnavailable: the circuit is open or no token became
+                available within RATE_LIMIT_MAX_WAIT seconds
+        """
+        if not self.breaker.allow():
+            UPSTREAM_REJECTED.inc(upstream=self.name, reason="circuit_open")
+            raise UpstreamUnavailable(self.name, "circuit open")
+
+        attempt = 0
+        while True:
+            if not self.bucket.acquire(RATE_LIMIT_MAX_WAIT):
+                self.breaker.release()
+                UPSTREAM_REJECTED.inc(upstream=self.name, reason="rate_limited")
+                raise UpstreamUnavailable(self.name, "rate limited")
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not self.is_retryable(e):
+                    # The upstream answered - the error is about this request, not its health
+                    self.breaker.release()
+                    raise
+                if attempt >= self.max_retries:
+                    self.breaker.record_failure()
+                    raise
+                attempt += 1
+                UPSTREAM_RETRIES.inc(upstream=self.name)
+                delay = self._backoff(attempt)
+                logger.info("%s call failed (%s), retry %d in %.2fs", self.name, e, attempt, delay)
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def acall(self, fn: Callable, *args, **kwargs):
+        """call() for a coroutine function: waits for tokens and backoff with asyncio.sleep"""
+        if not self.breaker.allow():
+            UPSTREAM_REJECTED.inc(upstream=self.name, reason="circuit_open")
+            raise UpstreamUnavailable(self.name, "circuit open")
+
+        attempt = 0
+        while True:
+            if not await self.bucket.acquire_async(RATE_LIMIT_MAX_WAIT):
+                self.breaker.release()
+                UPSTREAM_REJECTED.inc(upstream=self.name, reason="rate_limited")
+                raise UpstreamUnavailable(self.name, "rate limited")
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                if not self.is_retryable(e):
+                    self.breaker.release()
+                    raise
+                if attempt >= self.max_retries:
+                    self.breaker.record_failure()
+                    raise
+                attempt += 1
+                UPSTREAM_RETRIES.inc(upstream=self.name)
+                delay = self._backoff(attempt)
+                logger.info("%s call failed (%s), retry %d in %.2fs", self.name, e, attempt, delay)
+                try:
+                    await asyncio.sleep(delay)
+                except BaseException:
+                    self.breaker.release()
+                    raise
+                continue
+            except BaseException:
+                # Cancelled - no verdict on the upstream
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            return result
+
+    def stream(self, fn: Callable, *args, **kwargs):
+        """
+        Iterate a streaming call through the rate limiter and circuit breaker
+
+        Streams are not retried: chunks may already have been passed on.
+        """
+        if not self.breaker.allow():
+            UPSTREAM_REJECTED.inc(upstream=self.name, reason="circuit_open")
+            raise UpstreamUnavailable(self.name, "circuit open")
+        if not self.bucket.acquire(RATE_LIMIT_MAX_WAIT):
+            self.breaker.release()
+            UPSTREAM_REJECTED.inc(upstream=self.name, reason="rate_limited")
+            raise UpstreamUnavailable(self.name, "rate limited")
+        try:
+            yield from fn(*args, **kwargs)
+        except Exception as e:
+            if self.is_retryable(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.release()
+            raise
+        except BaseException:
+            # Consumer stopped early (GeneratorExit) - no verdict on the upstream
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+
+
+_upstreams: Dict[str, Upstream] = {}
+
+
+def get_upstream(name: str, env_prefix: str, is_retryable: Callable[[Exception], bool],
+                 default_rate: float, default_burst: int,
+                 default_max_retries: Optional[int] = None) -> Upstream:
+    """
+    Create (once) the Upstream for an API, configured from <env_prefix>_RATE_LIMIT
+    (calls per second, 0 = unlimited), <env_prefix>_BURST and <env_prefix>_MAX_RETRIES
+    """
+    if name not in _upstreams:
+        max_retries = UPSTREAM_MAX_RETRIES if default_max_retries is None else default_max_retries
+        _upstreams[name] = Upstream(
+            name,
+            rate=float(os.environ.get(f"{env_prefix}_RATE_LIMIT", str(default_rate))),
+            burst=int(os.environ.get(f"{env_prefix}_BURST", str(default_burst))),
+            max_retries=int(os.environ.get(f"{env_prefix}_MAX_RETRIES", str(max_retries))),
+            is_retryable=is_retryable
+        )
+    return _upstreams[name]
+
+
+def has_headroom(name: str, fraction: float) -> bool:
+    """
+    Whether an upstream's circuit is closed and at least `fraction` of its
+    rate limit burst is unused - background work checks this so it never
+    takes the tokens live requests need
+    """
+    upstream = _upstreams.get(name)
+    if upstream is None:
+        return True
+    if upstream.breaker.state != CircuitBreaker.CLOSED:
+        return False
+    return upstream.bucket.rate <= 0 or upstream.bucket.available() >= fraction * upstream.bucket.burst
+
+
+# Gauge values of traivel_circuit_state
+_STATE_VALUES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+
+def get_upstream_states() -> Dict[str, str]:
+    return {name: upstream.breaker.state for name, upstream in _upstreams.items()}
+
+
+def upstream_state_collector():
+    """Collector exposing circuit states (0 closed, 1 half-open, 2 open) and rate limits"""
+    samples: List[Tuple[str, str, Dict[str, str], float]] = []
+    for name, upstream in list(_upstreams.items()):
+        labels = {"upstream": name}
+        samples.append(("traivel_circuit_state", "gauge", labels, _STATE_VALUES[upstream.breaker.state]))
+        samples.append(("traivel_upstream_rate_limit", "gauge", labels, upstream.bucket.rate))
+    return samples
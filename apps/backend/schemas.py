@@ -0,0 +1,48 @@
+# apps/backend/schemas.py
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+# Version of the /api/recommend response body; version 1 is the legacy string format
+RESPONSE_VERSION = 2
+
+
+class Activity(BaseModel):
+    """One recommended activity, as generated by Gemini or stored in the RAG database"""
+    # Extra fields (e.g. imgUrl added by Places enrichment) are kept as they are
+    model_config = ConfigDict(extra="allow", str_strip_whitespace=True)
+
+    activity: str = Field(..., min_length=1)
+    # Left out when the request doesn't ask for it (fields parameter)
+    description: Optional[str] = None
+    link: Optional[str] = None
+    imgUrl: Optional[str] = None
+
+
+class Weather(BaseModel):
+    """Current weather, or only 'error' if it could not be fetched"""
+    temperature: Optional[float] = None
+    description: Optional[str] = None
+    humidity: Optional[int] = None
+    wind_speed: Optional[float] = None
+    error: Optional[str] = None
+
+
+class RecommendationResponse(BaseModel):
+    """Body of /api/recommend and of each /api/recommend/batch line"""
+    version: int = RESPONSE_VERSION
+    destination: str
+    activities: List[Activity] = []
+    weather: Optional[Weather] = None
+    error: Optional[str] = None
+    # Start of the unparseable LLM response, for debugging
+    raw_response: Optional[str] = None
+
+
+class LegacyRecommendationResponse(BaseModel):
+    """Version 1 body (legacy=true): activities as a JSON-encoded string"""
+    destination: str
+    recommendation: str
+    weather: Optional[Weather] = None
+    error: Optional[str] = None
+    raw_response: Optional[str] = None
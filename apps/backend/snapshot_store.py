@@ -0,0 +1,247 @@
+# apps/backend/snapshot_store.py
+"""
+Read-only snapshot of the curated destinations with pre-enriched activities
+
+Written by `python manage.py materialize`. The file is memory-mapped: a small
+JSON header (lookup keys and entry offsets) is parsed on load, and an
+entry's JSON payload is only decoded when it is requested. A rewritten file
+is picked up and swapped in atomically by every worker.
+
+File layout:
+    8 bytes   magic b"TRVSNAP1"
+    4 bytes   header length (little-endian uint32)
+    header    JSON: version, created_at, source_hash, keys {key: entry}, offsets [[start, length]]
+    payload   concatenated JSON entries (offsets are relative to the payload start)
+"""
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Dict, List, Optional
+
+import orjson
+
+import places_service
+from normalization import fold_accents, normalize_destination
+
+logger = logging.getLogger(__name__)
+
+CURATED_SNAPSHOT_PATH = os.environ.get("CURATED_SNAPSHOT_PATH", "./snapshots/curated.snap")
+# How often (seconds) workers check whether the snapshot file was replaced
+SNAPSHOT_CHECK_INTERVAL = float(os.environ.get("SNAPSHOT_CHECK_INTERVAL", "5"))
+
+MAGIC = b"TRVSNAP1"
+_HEADER_LENGTH = struct.Struct("<I")
+
+# Photo URLs carry the Places API key - it is stored as this placeholder and
+# filled in when an entry is read, so the key is never written to disk
+API_KEY_PLACEHOLDER = "{places_api_key}"
+_API_KEY_PLACEHOLDER_BYTES = API_KEY_PLACEHOLDER.encode()
+
+
+class Snapshot:
+    """One memory-mapped snapshot file"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a curated snapshot")
+        header_start = len(MAGIC) + _HEADER_LENGTH.size
+        (header_length,) = _HEADER_LENGTH.unpack_from(self._mmap, len(MAGIC))
+        header = orjson.loads(self._mmap[header_start:header_start + header_length])
+        self._payload_start = header_start + header_length
+        self.version: int = header["version"]
+        self.created_at: float = header["created_at"]
+        self.source_hash: str = header.get("source_hash", "")
+        self._keys: Dict[str, int] = header["keys"]
+        self._offsets: List[List[int]] = header["offsets"]
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def get(self, query: str, api_key: str = "") -> Optional[Dict]:
+        """Return the entry for a destination name, alias or "name, country", or None"""
+        key = normalize_destination(query)
+        index = self._keys.get(key)
+        if index is None:
+            index = self._keys.get(fold_accents(key))
+        if index is None:
+            return None
+        start, length = self._offsets[index]
+        start += self._payload_start
+        payload = self._mmap[start:start + length]
+        if api_key:
+            payload = payload.replace(_API_KEY_PLACEHOLDER_BYTES, api_key.encode())
+        return orjson.loads(payload)
+
+
+def write_snapshot(path: str, entries: List[Dict], keys: Dict[str, int], version: int, source_hash: str = ""):
+    """
+    Write a snapshot to a temporary file and atomically move it into place
+
+    Args:
+        entries: JSON-serializable destination records
+        keys: Lookup key -> index into entries
+    """
+    payloads = [orjson.dumps(entry) for entry in entries]
+    offsets = []
+    position = 0
+    for payload in payloads:
+        offsets.append([position, len(payload)])
+        position += len(payload)
+
+    header = orjson.dumps({
+        "version": version,
+        "created_at": time.time(),
+        "source_hash": source_hash,
+        "keys": keys,
+        "offsets": offsets
+    })
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_HEADER_LENGTH.pack(len(header)))
+        f.write(header)
+        for payload in payloads:
+            f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class SnapshotStore:
+    """
+    Serves lookups from the current snapshot, swapping in a new one when the
+    file is replaced (checked at most every SNAPSHOT_CHECK_INTERVAL seconds)
+    """
+
+    def __init__(self, path: str, check_interval: float = SNAPSHOT_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._snapshot: Optional[Snapshot] = None
+        self._file_version = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _file_stat(self):
+        try:
+            stat = os.stat(self.path)
+            return stat.st_mtime_ns, stat.st_size, stat.st_ino
+        except OSError:
+            return None
+
+    def current(self) -> Optional[Snapshot]:
+        """Return the current snapshot, reloading it if the file changed"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return self._snapshot
+        with self._lock:
+            if now >= self._next_check:
+                self._next_check = now + self.check_interval
+                file_version = self._file_stat()
+                if file_version != self._file_version:
+                    self._load(file_version)
+        return self._snapshot
+
+    def _load(self, file_version):
+        if file_version is None:
+            if self._snapshot is not None:
+                logger.warning("Curated snapshot %s was removed", self.path)
+            self._snapshot, self._file_version = None, None
+            return
+        try:
+            snapshot = Snapshot(self.path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.error("Could not load curated snapshot %s: %s", self.path, e)
+            return
+        # Readers holding the previous snapshot keep using it until they're done
+        self._snapshot, self._file_version = snapshot, file_version
+        logger.info("Loaded curated snapshot v%d (%d destinations)", snapshot.version, len(snapshot))
+
+    def get(self, destination: str, api_key: str = "") -> Optional[Dict]:
+        snapshot = self.current()
+        entry = snapshot.get(destination, api_key) if snapshot is not None else None
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "size": len(snapshot) if snapshot is not None else 0,
+            "version": snapshot.version if snapshot is not None else None,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+curated_store = SnapshotStore(CURATED_SNAPSHOT_PATH)
+
+
+def get_curated_destination(destination: str) -> Optional[Dict]:
+    """Snapshot entry of a curated destination (enriched activities), or None"""
+    return curated_store.get(destination, places_service.GOOGLE_PLACES_API_KEY or "")
+
+
+def materialize_curated_snapshot(path: str = CURATED_SNAPSHOT_PATH) -> Dict[str, int]:
+    """
+    Enrich every activity of the curated destinations with Google Places photos
+    and links, and write the result as a new snapshot version
+
+    Returns:
+        Dict with the snapshot 'version', 'destinations' and 'activities' counts
+    """
+    from rag_service import index_keys, load_destinations_data
+
+    destinations = load_destinations_data()
+    if not places_service.GOOGLE_PLACES_API_KEY:
+        logger.warning("GOOGLE_PLACES_API_KEY is not set - the snapshot will only have placeholder images")
+
+    entries, keys = [], {}
+    for dest in destinations:
+        activities = [{**activity, "link": activity.get("link", "")} for activity in dest.get('activities', [])]
+        # No time budget: the job waits for every lookup
+        activities = places_service.get_place_info_batch(activities, dest['destination'], budget_ms=0)
+        if places_service.GOOGLE_PLACES_API_KEY:
+            for activity in activities:
+                if activity.get('imgUrl'):
+                    activity['imgUrl'] = activity['imgUrl'].replace(
+                        places_service.GOOGLE_PLACES_API_KEY, API_KEY_PLACEHOLDER
+                    )
+        index = len(entries)
+        entries.append({
+            "destination": dest['destination'],
+            "country": dest['country'],
+            "description": dest.get('description', ''),
+            "activities": activities
+        })
+        for key in index_keys(dest['destination'], dest['country'], dest.get('aliases', [])):
+            # First destination wins if two share an alias, like the RAG name index
+            keys.setdefault(key, index)
+        logger.info("Materialized %s (%d activities)", dest['destination'], len(activities))
+
+    try:
+        version = Snapshot(path).version + 1
+    except (OSError, ValueError, KeyError):
+        version = 1
+    source_hash = hashlib.sha256(orjson.dumps(destinations, option=orjson.OPT_SORT_KEYS)).hexdigest()
+    write_snapshot(path, entries, keys, version, source_hash)
+
+    stats = {
+        "version": version,
+        "destinations": len(entries),
+        "activities": sum(len(entry["activities"]) for entry in entries)
+    }
+    logger.info("Wrote curated snapshot %s: %s", path, stats)
+    return stats
@@ -0,0 +1,122 @@
+# apps/backend/vector_index.py
+"""
+In-process nearest-neighbour index for the RAG destinations
+
+L2-normalized embeddings are stored as one contiguous float32 matrix in a
+.npy file that is memory-mapped, so all workers on a host share the same
+pages. A search is a single matrix-vector product plus argpartition.
+
+VectorIndex implements the subset of the Chroma collection API used by
+rag_service (get and query), with Chroma's default squared-L2 distances:
+for unit vectors, distance = 2 - 2 * cosine similarity.
+"""
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.npy"
+RECORDS_FILE = "records.json"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class VectorIndex:
+    """Memory-mapped embedding matrix with the IDs and metadata of its rows"""
+
+    def __init__(self, vectors: np.ndarray, ids: List[str], metadatas: List[Dict]):
+        if len(ids) != len(vectors) or len(metadatas) != len(vectors):
+            raise ValueError("ids, metadatas and vectors must have the same length")
+        self.vectors = vectors
+        self.ids = ids
+        self.metadatas = metadatas
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["VectorIndex"]:
+        """Memory-map an index written by save(), or return None if there is none"""
+        vectors_path = os.path.join(directory, VECTORS_FILE)
+        records_path = os.path.join(directory, RECORDS_FILE)
+        if not (os.path.exists(vectors_path) and os.path.exists(records_path)):
+            return None
+        try:
+            with open(records_path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+            vectors = np.load(vectors_path, mmap_mode="r")
+            return cls(vectors, records["ids"], records["metadatas"])
+        except (OSError, ValueError, KeyError) as e:
+            # e.g. a worker read the files between the two renames of save()
+            logger.warning("Could not load vector index from %s: %s", directory, e)
+            return None
+
+    @staticmethod
+    def save(directory: str, ids: List[str], embeddings, metadatas: List[Dict]):
+        """Write an index; each file is replaced atomically so readers never see a partial file"""
+        os.makedirs(directory, exist_ok=True)
+        vectors = np.ascontiguousarray(_normalize(embeddings)) if len(ids) else np.zeros((0, 0), np.float32)
+
+        vectors_path = os.path.join(directory, VECTORS_FILE)
+        records_path = os.path.join(directory, RECORDS_FILE)
+        with open(vectors_path + ".tmp", "wb") as f:
+            np.save(f, vectors)
+        with open(records_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"ids": ids, "metadatas": metadatas}, f, ensure_ascii=False)
+        os.replace(vectors_path + ".tmp", vectors_path)
+        os.replace(records_path + ".tmp", records_path)
+
+    @staticmethod
+    def version(directory: str) -> Optional[int]:
+        """Modification time of the index, to notice when another process rewrote it"""
+        try:
+            return os.stat(os.path.join(directory, RECORDS_FILE)).st_mtime_ns
+        except OSError:
+            return None
+
+    def get(self, include: Optional[List[str]] = None, **kwargs) -> Dict:
+        """All rows, like Chroma's collection.get()"""
+        return {"ids": list(self.ids), "metadatas": list(self.metadatas)}
+
+    def query(self, query_embeddings, n_results: int = 1, **kwargs) -> Dict:
+        """
+        Nearest neighbours of each query embedding, like Chroma's collection.query()
+
+        Returns:
+            Dict of 'ids', 'metadatas' and 'distances', one list per query,
+            nearest first
+        """
+        queries = _normalize(query_embeddings)
+        result = {"ids": [], "metadatas": [], "distances": []}
+        k = min(n_results, len(self))
+        if k <= 0:
+            for _ in range(len(queries)):
+                result["ids"].append([])
+                result["metadatas"].append([])
+                result["distances"].append([])
+            return result
+
+        # (queries x rows) cosine similarities in one BLAS call
+        scores = queries @ self.vectors.T
+        if k < len(self):
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(len(self)), (len(queries), 1))
+
+        for row, candidates in enumerate(top):
+            candidates = candidates[np.argsort(-scores[row, candidates])]
+            result["ids"].append([self.ids[i] for i in candidates])
+            result["metadatas"].append([self.metadatas[i] for i in candidates])
+            result["distances"].append([float(2 - 2 * scores[row, i]) for i in candidates])
+        return result
@@ -1,19 +1,145 @@
 # apps/backend/weather.py
+import logging
 import os
+import httpx
 import requests
+from typing import Optional
+from requests.adapters import HTTPAdapter
+from cache import MISSING, create_cache
+from http_clients import get_client
+from metrics import record_upstream, track_stage
+from resilience import RetryableError, get_upstream
+
+logger = logging.getLogger(__name__)
 
 API_KEY = os.environ.get("OPENWEATHER_API_KEY")
 if API_KEY:
     API_KEY = API_KEY.strip('"').strip("'")
 BASE_URL = "https://api.openweathermap.org/data/2.5/weather"
 
+# (connect, read) timeouts in seconds
+WEATHER_TIMEOUT = (
+    float(os.environ.get("WEATHER_CONNECT_TIMEOUT", "3")),
+    float(os.environ.get("WEATHER_READ_TIMEOUT", "5"))
+)
+WEATHER_CACHE_TTL = int(os.environ.get("WEATHER_CACHE_TTL", "600"))
+# Seconds past WEATHER_CACHE_TTL that cached weather is still served while it is refreshed
+WEATHER_STALE_TTL = int(os.environ.get("WEATHER_STALE_TTL", "300"))
+
+# Pooled keep-alive session shared by all synchronous requests (async ones use http_clients)
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=20))
+
+def _is_retryable(error: Exception) -> bool:
+    return isinstance(error, (RetryableError, requests.ConnectionError, requests.Timeout, httpx.TransportError))
+
+# Rate limit (per worker), retries and circuit breaker for OpenWeather - the
+# free plan allows 60 calls per minute
+_weather_upstream = get_upstream("openweather", "WEATHER", _is_retryable, default_rate=1, default_burst=10)
+
+# Shared by the workers when CACHE_BACKEND is sqlite or redis
+_weather_cache = create_cache("weather", maxsize=1000, ttl=WEATHER_CACHE_TTL + WEATHER_STALE_TTL)
+
+def _normalize_city(city: str) -> str:
+    return " ".join(city.lower().split())
+
+def _weather_ttl(weather_data: dict) -> Optional[float]:
+    # Errors are not cached
+    return None if "error" in weather_data else WEATHER_CACHE_TTL
+
+def get_weather_cache_stats() -> dict:
+    """Return hit/miss counters of the weather cache"""
+    return _weather_cache.stats()
+
 def get_weather(city: str) -> dict:
-    """Return current weather info for a city"""
+    """
+    Return current weather info for a city
+    
+    Successful responses are cached per normalized city for WEATHER_CACHE_TTL
+    seconds, and concurrent requests for the same city (across workers, with
+    a shared CACHE_BACKEND) share one API call. For WEATHER_STALE_TTL more
+    seconds, the cached weather is returned while it is refreshed in the
+    background.
+    """
+    if not API_KEY:
+        logger.warning("OPENWEATHER_API_KEY is not set!")
+        return {"error": "OPENWEATHER_API_KEY environment variable not set"}
+
+    weather_data = _weather_cache.get_or_set(
+        _normalize_city(city), lambda: _fetch_weather(city), ttl=_weather_ttl, stale_ttl=WEATHER_STALE_TTL
+    )
+    # Callers get their own copy so the cached/shared dict is never mutated
+    return dict(weather_data)
+
+def get_cached_weather(city: str, revalidate: bool = True) -> Optional[dict]:
+    """
+    Return cached (possibly stale) weather for a city without calling the API,
+    or None. Stale weather is refreshed in the background unless revalidate is False.
+    """
+    entry = _weather_cache.get_entry(_normalize_city(city))
+    if entry is MISSING:
+        return None
+    weather_data, remaining_ttl = entry
+    if revalidate and remaining_ttl <= WEATHER_STALE_TTL:
+        refresh_weather_in_background(city)
+    return dict(weather_data)
+
+def get_weather_ttl(city: str) -> Optional[float]:
+    """Seconds until the cached weather of a city goes stale (negative once it is stale), or None"""
+    entry = _weather_cache.get_entry(_normalize_city(city))
+    return None if entry is MISSING else entry[1] - WEATHER_STALE_TTL
+
+def refresh_weather(city: str) -> dict:
+    """Fetch the weather of a city and cache it, even if it is cached"""
     if not API_KEY:
-        print("DEBUG - OPENWEATHER_API_KEY is not set!")
         return {"error": "OPENWEATHER_API_KEY environment variable not set"}
+    weather_data = _weather_cache.refresh(
+        _normalize_city(city), lambda: _fetch_weather(city), ttl=_weather_ttl, stale_ttl=WEATHER_STALE_TTL
+    )
+    return dict(weather_data)
 
-    print(f"DEBUG - Fetching weather for: {city}")
+def refresh_weather_in_background(city: str):
+    """Fetch weather into the cache off the request path (at most once at a time per city)"""
+    if not API_KEY:
+        return
+    _weather_cache.revalidate(
+        _normalize_city(city), lambda: _fetch_weather(city), ttl=_weather_ttl, stale_ttl=WEATHER_STALE_TTL
+    )
+
+def _request_weather(params: dict) -> requests.Response:
+    """One OpenWeather request - throttling and server errors raise RetryableError"""
+    try:
+        with track_stage("weather"):
+            response = _session.get(BASE_URL, params=params, timeout=WEATHER_TIMEOUT)
+    except Exception:
+        record_upstream("openweather", "error")
+        raise
+    record_upstream("openweather", response.status_code)
+    if response.status_code == 429 or response.status_code >= 500:
+        raise RetryableError(f"OpenWeather returned HTTP {response.status_code}")
+    return response
+
+def _parse_weather(response) -> dict:
+    """Turn an OpenWeather response (requests or httpx) into weather data or an error"""
+    data = response.json()
+
+    logger.debug("Weather API status code: %s", response.status_code)
+
+    if response.status_code != 200:
+        return {"error": data.get("message", "Unknown error")}
+
+    weather_data = {
+        "temperature": round(data["main"]["temp"]),
+        "description": data["weather"][0]["description"],
+        "humidity": data["main"]["humidity"],
+        "wind_speed": data["wind"]["speed"]
+    }
+    logger.debug("Parsed weather data: %s", weather_data)
+    return weather_data
+
+def _fetch_weather(city: str) -> dict:
+    """Call the OpenWeather API"""
+    logger.debug("Fetching weather for: %s", city)
 
     try:
         params = {
@@ -21,22 +147,48 @@ def get_weather(city: str) -> dict:
             "appid": API_KEY,
             "units": "metric"  # Celsius
         }
-        response = requests.get(BASE_URL, params=params)
-        data = response.json()
+        response = _weather_upstream.call(_request_weather, params)
+        return _parse_weather(response)
+    except Exception as e:
+        logger.warning("Weather request for %s failed: %s", city, e)
+        return {"error": str(e)}
 
-        print(f"DEBUG - Weather API status code: {response.status_code}")
+async def aget_weather(city: str) -> dict:
+    """
+    Async variant of get_weather - the request goes through the pooled
+    HTTP client without blocking the event loop
+    """
+    if not API_KEY:
+        logger.warning("OPENWEATHER_API_KEY is not set!")
+        return {"error": "OPENWEATHER_API_KEY environment variable not set"}
 
-        if response.status_code != 200:
-            return {"error": data.get("message", "Unknown error")}
+    weather_data = await _weather_cache.aget_or_set(
+        _normalize_city(city), lambda: _afetch_weather(city), ttl=_weather_ttl, stale_ttl=WEATHER_STALE_TTL
+    )
+    return dict(weather_data)
 
-        weather_data = {
-            "temperature": round(data["main"]["temp"]),
-            "description": data["weather"][0]["description"],
-            "humidity": data["main"]["humidity"],
-            "wind_speed": data["wind"]["speed"]
-        }
-        print(f"DEBUG - Parsed weather data: {weather_data}")
-        return weather_data
+async def _arequest_weather(params: dict) -> httpx.Response:
+    """One async OpenWeather request - throttling and server errors raise RetryableError"""
+    client = get_client(
+        "openweather", httpx.Timeout(WEATHER_TIMEOUT[1], connect=WEATHER_TIMEOUT[0])
+    )
+    try:
+        with track_stage("weather"):
+            response = await client.get(BASE_URL, params=params)
+    except Exception:
+        record_upstream("openweather", "error")
+        raise
+    record_upstream("openweather", response.status_code)
+    if response.status_code == 429 or response.status_code >= 500:
+        raise RetryableError(f"OpenWeather returned HTTP {response.status_code}")
+    return response
+
+async def _afetch_weather(city: str) -> dict:
+    logger.debug("Fetching weather for: %s", city)
+    try:
+        params = {"q": city, "appid": API_KEY, "units": "metric"}
+        response = await _weather_upstream.acall(_arequest_weather, params)
+        return _parse_weather(response)
     except Exception as e:
-        print(f"DEBUG - Weather exception: {e}")
+        logger.warning("Weather request for %s failed: %s", city, e)
         return {"error": str(e)}
@@ -4,6 +4,16 @@ import { firstValueFrom } from 'rxjs';
 import { Activity } from '../models/activity';
 import { Weather } from '../models/weather';
 
+// Version 2 body of GET /api/recommend - activities arrive as a typed array
+interface RecommendationResponse {
+  version: number;
+  destination: string;
+  activities: Activity[];
+  weather?: Weather;
+  error?: string;
+  raw_response?: string;
+}
+
 @Injectable({
   providedIn: 'root'
 })
@@ -15,13 +25,7 @@ export class BackendService {
   async getRecommendations(destination: string): Promise<{ activities: Activity[], weather: Weather | null }> {
     try {
       const response = await firstValueFrom(
-        this.http.get<{ 
-          destination: string; 
-          recommendation: string;
-          weather: Weather;
-          error?: string;
-          raw_response?: string;
-        }>(
+        this.http.get<RecommendationResponse>(
           `${this.apiUrl}/api/recommend?destination=${encodeURIComponent(destination)}`
         )
       );
@@ -29,28 +33,17 @@ export class BackendService {
       // Check if there was an error from the backend
       if (response.error) {
         console.error('Backend error:', response.error);
-        console.error('Raw response:', response.raw_response || response.recommendation);
+        console.error('Raw response:', response.raw_response);
         alert(`Error: ${response.error}\n\nCheck console for details.`);
         return { activities: [], weather: null };
       }
 
-      // Parse the JSON array from the recommendation string
-      const activities = JSON.parse(response.recommendation);
-      
-      if (!Array.isArray(activities)) {
-        console.error('Expected array, got:', typeof activities, activities);
-        return { activities: [], weather: null };
-      }
-      
       return { 
-        activities, 
-        weather: response.weather 
+        activities: response.activities, 
+        weather: response.weather ?? null 
       };
     } catch (error) {
       console.error('Error fetching recommendations:', error);
-      if (error instanceof SyntaxError) {
-        console.error('This is a JSON parsing error. The backend returned invalid JSON.');
-      }
       return { activities: [], weather: null };
     }
   }